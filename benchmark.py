@@ -0,0 +1,244 @@
+"""Load benchmark for the Bluetooth Water Softener integration.
+
+Drives simulated devices through the real coordinator and sensor entities
+on a Home Assistant instance and reports throughput, notification-to-state
+latency, CPU time per frame and memory growth. Run it from the directory
+containing `custom_components`, for example:
+
+    python -m custom_components.water_softener_ble.benchmark --devices 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import timedelta
+from functools import partial
+import gc
+import logging
+import resource
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from homeassistant.const import CONF_ADDRESS, EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.entity_platform import EntityPlatform
+
+from . import connection, paths
+from .const import (
+    CHECKSUM_SUM8,
+    CONF_CHECKSUM,
+    CONF_COALESCE_WINDOW,
+    CONF_CONNECTION_SLOTS,
+    DOMAIN,
+)
+from .coordinator import WaterSoftenerDataUpdateCoordinator
+from .parser import (
+    PACKET_LAYOUTS,
+    UNCONFIRMED_LAYOUTS,
+    WaterSoftenerBluetoothDeviceData,
+)
+from .sensor import SENSOR_DESCRIPTIONS, WaterSoftenerSensor
+from .simulator import SimulatedBleakClient, SimulatedSoftener, SimulationProfile
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _BenchmarkSoftener(SimulatedSoftener):
+    """A softener whose flow changes on every dashboard frame."""
+
+    def tick(self, elapsed: float) -> None:
+        """Pick a new flow so every frame produces a state change."""
+        super().tick(elapsed)
+        self.flow = round(self.random.uniform(0.5, 4.0), 2)
+
+
+class Benchmark:
+    """Run simulated devices through the integration."""
+
+    def __init__(self, hass: HomeAssistant, args: argparse.Namespace) -> None:
+        """Initialize the benchmark."""
+        self.hass = hass
+        self.args = args
+        self.profile = SimulationProfile(
+            dashboard_rate=args.rate,
+            slow_interval=args.slow_interval,
+            fragment_probability=args.fragment,
+            merge_probability=args.merge,
+            corrupt_probability=args.corrupt,
+            drop_probability=args.drop,
+            checksum=CHECKSUM_SUM8,
+        )
+        self.devices = {
+            f"AA:BB:CC:00:{i // 256:02X}:{i % 256:02X}": _BenchmarkSoftener(seed=i)
+            for i in range(args.devices)
+        }
+        self.clients: dict[str, SimulatedBleakClient] = {}
+        self.coordinators: list[WaterSoftenerDataUpdateCoordinator] = []
+        self._flow_entities: dict[str, str] = {}
+        self._sent: dict[tuple[str, float], float] = {}
+        self.latencies: list[float] = []
+
+    async def _establish_connection(
+        self, client_class, device, name, disconnected_callback=None, **kwargs
+    ) -> SimulatedBleakClient:
+        """Replace bleak-retry-connector with a simulated client."""
+        client = SimulatedBleakClient(
+            self.devices[device.address], self.profile, disconnected_callback
+        )
+        client.on_frame_sent = partial(self._frame_sent, device.address)
+        await client.connect()
+        self.clients[device.address] = client
+        return client
+
+    def _frame_sent(self, address: str, frame: bytes, sent: float) -> None:
+        """Remember when each dashboard flow value left the device."""
+        if frame[:3] == b"uu\x00":
+            self._sent[(address, self.devices[address].flow)] = sent
+
+    @callback
+    def _state_changed(self, event: Event) -> None:
+        """Match flow state changes to the frames that carried them."""
+        entity_id = event.data["entity_id"]
+        if (address := self._flow_entities.get(entity_id)) is None:
+            return
+        new_state = event.data["new_state"]
+        try:
+            value = float(new_state.state)
+        except (AttributeError, ValueError):
+            return
+        if (sent := self._sent.pop((address, value), None)) is not None:
+            self.latencies.append(time.perf_counter() - sent)
+
+    async def async_setup(self) -> None:
+        """Create coordinators and entities for every simulated device."""
+        connection.establish_connection = self._establish_connection
+        paths.async_current_allocations = lambda hass, source=None: None
+        paths.async_scanner_devices_by_address = (
+            lambda hass, address, connectable=True: []
+        )
+        connection.async_ble_device_from_address = (
+            lambda hass, address, connectable=True: SimpleNamespace(
+                address=address, name=address
+            )
+        )
+        platform = EntityPlatform(
+            hass=self.hass,
+            logger=_LOGGER,
+            domain="sensor",
+            platform_name=DOMAIN,
+            platform=None,
+            scan_interval=timedelta(seconds=30),
+            entity_namespace=None,
+        )
+        options = {
+            CONF_COALESCE_WINDOW: self.args.coalesce_window,
+            CONF_CONNECTION_SLOTS: len(self.devices),
+            CONF_CHECKSUM: CHECKSUM_SUM8,
+        }
+        entities = []
+        for address in self.devices:
+            entry = SimpleNamespace(
+                entry_id=address, data={CONF_ADDRESS: address}, options=options
+            )
+            coordinator = WaterSoftenerDataUpdateCoordinator(self.hass, entry)
+            # Latency is measured on the flow, which is not published yet.
+            coordinator.parser = WaterSoftenerBluetoothDeviceData(
+                PACKET_LAYOUTS + UNCONFIRMED_LAYOUTS
+            )
+            await coordinator.async_refresh()
+            self.coordinators.append(coordinator)
+            entities.extend(
+                WaterSoftenerSensor(coordinator, description)
+                for description in SENSOR_DESCRIPTIONS
+            )
+        await platform.async_add_entities(entities)
+        for entity in entities:
+            if entity.entity_description.key == "current_water_flow":
+                self._flow_entities[entity.entity_id] = entity.coordinator.address
+        self.hass.bus.async_listen(EVENT_STATE_CHANGED, self._state_changed)
+
+    def _frames_parsed(self) -> int:
+        return sum(coordinator.framer.frames for coordinator in self.coordinators)
+
+    async def async_run(self) -> dict[str, float]:
+        """Run the load and return the measurements."""
+        await asyncio.sleep(self.args.warmup)
+        gc.collect()
+        self.latencies.clear()
+        frames_start = self._frames_parsed()
+        rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        await asyncio.sleep(self.args.duration)
+
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        frames = self._frames_parsed() - frames_start
+        gc.collect()
+        rss_end = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results = {
+            "devices": len(self.devices),
+            "frames": frames,
+            "frames_per_second": frames / wall,
+            "cpu_us_per_frame": cpu / frames * 1e6 if frames else 0.0,
+            "peak_rss_growth_kib": rss_end - rss_start,
+            "corrupt_frames": sum(c.framer.corrupt_frames for c in self.coordinators),
+            "reconnects": sum(
+                max(0, c.connection.connect_count - 1) for c in self.coordinators
+            ),
+        }
+        if len(self.latencies) >= 2:
+            percentiles = statistics.quantiles(self.latencies, n=100)
+            results["latency_p50_ms"] = percentiles[49] * 1e3
+            results["latency_p95_ms"] = percentiles[94] * 1e3
+            results["latency_p99_ms"] = percentiles[98] * 1e3
+        return results
+
+    async def async_stop(self) -> None:
+        """Disconnect every simulated device."""
+        for coordinator in self.coordinators:
+            await coordinator.async_stop()
+
+
+async def _async_main(args: argparse.Namespace) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        await dr.async_load(hass)
+        await er.async_load(hass)
+        benchmark = Benchmark(hass, args)
+        try:
+            await benchmark.async_setup()
+            return await benchmark.async_run()
+        finally:
+            await benchmark.async_stop()
+            await hass.async_stop(force=True)
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=20.0, help="frames/s per device")
+    parser.add_argument("--slow-interval", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--coalesce-window", type=float, default=0.0)
+    parser.add_argument("--fragment", type=float, default=0.0)
+    parser.add_argument("--merge", type=float, default=0.0)
+    parser.add_argument("--corrupt", type=float, default=0.0)
+    parser.add_argument("--drop", type=float, default=0.0)
+    args = parser.parse_args()
+
+    results = asyncio.run(_async_main(args))
+    for name, value in results.items():
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+        print(f"{name:>22}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Raw notification capture and offline replay.
+
+Captures are a sequence of size-bounded, rotating files. Each file starts
+with a header of magic bytes and the capture start time (unix seconds,
+float64), followed by records of a uint32 millisecond offset from the start
+time, a uint16 payload length and the raw notification payload. Offsets
+are measured on the monotonic clock, so wall clock steps do not disturb
+them.
+
+Replay a capture through the parser with:
+
+    python -m custom_components.water_softener_ble.capture capture.bin
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterator
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+
+from .const import CHECKSUM_NONE
+from .framer import CHECKSUMS, FrameReassembler
+from .parser import (
+    PACKET_LAYOUTS,
+    UNCONFIRMED_LAYOUTS,
+    WaterSoftenerBluetoothDeviceData,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"WSCAP1"
+_HEADER = struct.Struct("<6sd")
+_RECORD = struct.Struct("<IH")
+_MAX_OFFSET_MS = 0xFFFFFFFF
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+
+
+class CaptureWriter:
+    """Append notifications to a rotating capture file.
+
+    `append` only adds to an in-memory buffer so it is safe to call from the
+    event loop; `take` and `write` move the buffer to disk and are meant to
+    be split between the event loop and an executor thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+    ) -> None:
+        """Initialize the writer."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        # Buffered records, grouped by the start time their offsets refer to,
+        # as unix time and as monotonic time.
+        self._segments: list[tuple[float, float, bytearray]] = []
+        self._file_started: float | None = None
+        self.records = 0
+        self.dropped = 0
+
+    def append(self, data: bytes | bytearray, now: float | None = None) -> None:
+        """Buffer one notification received at monotonic time `now`.
+
+        Never raises: a notification that cannot be recorded is dropped from
+        the capture only.
+        """
+        if now is None:
+            now = time.monotonic()
+        offset = 0
+        if self._segments:
+            _, monotonic_started, buffer = self._segments[-1]
+            offset = max(0, int((now - monotonic_started) * 1000))
+        if not self._segments or offset > _MAX_OFFSET_MS:
+            offset, buffer = 0, bytearray()
+            self._segments.append((time.time(), now, buffer))
+        try:
+            record = _RECORD.pack(offset, len(data))
+        except struct.error as err:
+            self.dropped += 1
+            _LOGGER.warning("Notification not captured: %s", err)
+            return
+        buffer += record
+        buffer += data
+        self.records += 1
+
+    def take(self) -> list[tuple[float, bytes]]:
+        """Return and clear the buffered records.
+
+        The last segment is kept open so later records share its start time.
+        """
+        segments = [(started, bytes(buffer)) for started, _, buffer in self._segments]
+        if self._segments:
+            started, monotonic_started, _ = self._segments[-1]
+            self._segments = [(started, monotonic_started, bytearray())]
+        return segments
+
+    def write(self, segments: list[tuple[float, bytes]]) -> None:
+        """Write segments returned by `take`, rotating files as needed."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        for started, data in segments:
+            if not data:
+                continue
+            if started != self._file_started or (
+                os.path.exists(self.path)
+                and os.path.getsize(self.path) + len(data) > self.max_bytes
+            ):
+                self._rotate()
+                self._file_started = started
+                data = _HEADER.pack(MAGIC, started) + data
+            with open(self.path, "ab") as file:
+                file.write(data)
+
+    def _rotate(self) -> None:
+        """Shift capture.bin to capture.bin.1 and so on."""
+        if not os.path.exists(self.path):
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def iter_capture(path: str) -> Iterator[tuple[float, memoryview]]:
+    """Yield (timestamp, payload) for every record of a capture file.
+
+    The file is memory-mapped and payloads are views into the mapping, valid
+    until the next record is requested.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < _HEADER.size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, started = _HEADER.unpack_from(mapped)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a capture file")
+            view = memoryview(mapped)
+            try:
+                end = len(mapped)
+                position = _HEADER.size
+                while position + _RECORD.size <= end:
+                    offset_ms, length = _RECORD.unpack_from(mapped, position)
+                    position += _RECORD.size
+                    if position + length > end:
+                        # Truncated by a crash mid-write.
+                        return
+                    payload = view[position : position + length]
+                    try:
+                        yield started + offset_ms / 1000, payload
+                    finally:
+                        # Also when the generator is closed early, so the
+                        # mapping can be closed.
+                        payload.release()
+                    position += length
+            finally:
+                view.release()
+
+
+def replay(
+    paths: list[str],
+    parser: WaterSoftenerBluetoothDeviceData | None = None,
+    realtime: bool = False,
+    checksum: str = CHECKSUM_NONE,
+) -> dict[str, int | float]:
+    """Stream captures through the framer and parser, oldest file first.
+
+    With `realtime` the original spacing between notifications is kept;
+    otherwise records are replayed as fast as possible.
+    """
+    if parser is None:
+        parser = WaterSoftenerBluetoothDeviceData()
+    stats = {"notifications": 0, "frames": 0, "unrecognized": 0, "changes": 0}
+
+    def handle_frame(frame: memoryview) -> None:
+        changed = parser.update(frame)
+        if changed is None:
+            stats["unrecognized"] += 1
+        else:
+            stats["changes"] += len(changed)
+
+    framer = FrameReassembler(handle_frame, checksum)
+    first: float | None = None
+    started = time.monotonic()
+    for path in paths:
+        for timestamp, payload in iter_capture(path):
+            if realtime:
+                if first is None:
+                    first = timestamp
+                delay = (timestamp - first) - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            stats["notifications"] += 1
+            framer.feed(payload)
+    stats["frames"] = framer.frames
+    stats["corrupt_frames"] = framer.corrupt_frames
+    stats["seconds"] = time.monotonic() - started
+    return stats
+
+
+def main() -> int:
+    """Replay capture files from the command line."""
+    parser = argparse.ArgumentParser(description="Replay water softener captures.")
+    parser.add_argument("paths", nargs="+", help="capture files, oldest first")
+    parser.add_argument("--realtime", action="store_true")
+    parser.add_argument("--checksum", choices=list(CHECKSUMS), default=CHECKSUM_NONE)
+    parser.add_argument(
+        "--unconfirmed",
+        action="store_true",
+        help="also decode the guessed fields of the 'uu' pages",
+    )
+    args = parser.parse_args()
+
+    device = WaterSoftenerBluetoothDeviceData(
+        PACKET_LAYOUTS + UNCONFIRMED_LAYOUTS if args.unconfirmed else PACKET_LAYOUTS
+    )
+    stats = replay(args.paths, device, args.realtime, args.checksum)
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+    for key, value in sorted(device.data.items()):
+        print(f"  {key} = {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
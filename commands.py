@@ -0,0 +1,174 @@
+"""Command queue for the Bluetooth Water Softener integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+import logging
+
+from bleak.exc import BleakError
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .scheduler import PRIORITY_COMMAND
+from .stats import ROUND_TRIP_BOUNDS, Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_COMMAND_TIMEOUT = 5.0
+DEFAULT_COMMAND_RETRIES = 2
+
+
+@dataclass
+class Command:
+    """A command waiting to be written to the device."""
+
+    name: str
+    payload: bytes
+    # Queued commands with the same key are superseded by the latest one.
+    key: tuple | None = None
+    # Echoed (page, setting_id, value) that confirms the write, if any.
+    expect: tuple[int, int, int] | None = None
+    timeout: float = DEFAULT_COMMAND_TIMEOUT
+    retries: int = DEFAULT_COMMAND_RETRIES
+    # Connection slot priority if the link has to be established for it.
+    priority: int = PRIORITY_COMMAND
+    futures: list[asyncio.Future] = field(default_factory=list)
+
+
+class CommandQueue:
+    """Serialize writes to the device and confirm them against echoes.
+
+    Commands are written by a single background worker, so notification
+    handling never waits behind a write. A queued command is replaced by a
+    newer one with the same key; the callers of both await the outcome of
+    the newer command.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        write: Callable[[bytes, int], Awaitable[None]],
+        connect: Callable[[int], Awaitable[object]] | None = None,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self._write = write
+        self._connect = connect
+        self._queue: deque[Command] = deque()
+        self._by_key: dict[tuple, Command] = {}
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self._ack: asyncio.Future | None = None
+        self._expect: tuple[int, int, int] | None = None
+        self.last_round_trip: float | None = None
+        self.round_trips = Histogram(ROUND_TRIP_BOUNDS)
+        self.failures = 0
+
+    async def async_submit(self, command: Command) -> None:
+        """Queue a command and wait until it is written and confirmed."""
+        future = self.hass.loop.create_future()
+        queued = self._by_key.get(command.key) if command.key is not None else None
+        if queued is not None:
+            _LOGGER.debug("Superseding queued %s command", queued.name)
+            queued.payload = command.payload
+            queued.expect = command.expect
+            queued.timeout = command.timeout
+            queued.retries = command.retries
+            queued.priority = min(queued.priority, command.priority)
+            queued.futures.append(future)
+        else:
+            command.futures.append(future)
+            self._queue.append(command)
+            if command.key is not None:
+                self._by_key[command.key] = command
+            self._wakeup.set()
+            if self._worker is None:
+                self._worker = self.hass.async_create_background_task(
+                    self._async_run(), "water softener command queue"
+                )
+        await future
+
+    @callback
+    def async_setting_echo(self, echo: tuple[int, int, int]) -> None:
+        """Confirm the in-flight write if the echo matches it."""
+        if self._ack is not None and not self._ack.done() and echo == self._expect:
+            self._ack.set_result(None)
+
+    async def async_stop(self) -> None:
+        """Stop the worker and fail all pending commands."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        while self._queue:
+            command = self._queue.popleft()
+            for future in command.futures:
+                if not future.done():
+                    future.set_exception(HomeAssistantError("Command queue stopped"))
+        self._by_key.clear()
+
+    async def _async_run(self) -> None:
+        """Write queued commands one at a time."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                command = self._queue.popleft()
+                if command.key is not None:
+                    self._by_key.pop(command.key, None)
+                try:
+                    await self._async_execute(command)
+                except asyncio.CancelledError:
+                    for future in command.futures:
+                        future.cancel()
+                    raise
+                except HomeAssistantError as err:
+                    for future in command.futures:
+                        if not future.done():
+                            future.set_exception(err)
+                else:
+                    for future in command.futures:
+                        if not future.done():
+                            future.set_result(None)
+
+    async def _async_execute(self, command: Command) -> None:
+        """Write a command, retrying until it is confirmed."""
+        error: Exception | None = None
+        for attempt in range(command.retries + 1):
+            try:
+                if self._connect is not None:
+                    # Connecting may wait for a slot and fail over between
+                    # paths; only the write and its confirmation are bounded
+                    # by the command timeout.
+                    await self._connect(command.priority)
+                started = self.hass.loop.time()
+                if command.expect is not None:
+                    self._ack = self.hass.loop.create_future()
+                    self._expect = command.expect
+                async with asyncio.timeout(command.timeout):
+                    _LOGGER.debug(
+                        "Sending %s command (attempt %s): %s",
+                        command.name,
+                        attempt + 1,
+                        command.payload.hex(),
+                    )
+                    await self._write(command.payload, command.priority)
+                    if self._ack is not None:
+                        await self._ack
+            except (BleakError, asyncio.TimeoutError) as err:
+                error = err
+                _LOGGER.debug("%s command not confirmed: %s", command.name, err)
+            else:
+                self.last_round_trip = self.hass.loop.time() - started
+                self.round_trips.record(self.last_round_trip)
+                return
+            finally:
+                self._ack = None
+                self._expect = None
+        self.failures += 1
+        raise HomeAssistantError(
+            f"Failed to send {command.name} command after "
+            f"{command.retries + 1} attempts: {error}"
+        )
@@ -1,15 +1,47 @@
 """Config flow for Bluetooth Water Softener."""
+from __future__ import annotations
+
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.components.bluetooth import (
-    BluetoothServiceInfoBleak,
-    async_discovered_service_info,
-)
+from homeassistant.components.bluetooth import BluetoothServiceInfoBleak
 from homeassistant.const import CONF_ADDRESS
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import DOMAIN, UART_SERVICE_UUID
+from .const import (
+    CONF_CAPTURE,
+    CONF_COALESCE_WINDOW,
+    CONF_CONNECTION_MODE,
+    CONF_CONNECTION_SLOTS,
+    CONF_DATA_TTL,
+    CONF_LONG_TERM_STATISTICS,
+    CONF_MAX_LATENCY,
+    CONF_POLL_INTERVAL,
+    CONF_QUIET_PERIOD,
+    CONF_REQUEST_FAMILIES,
+    CONNECTION_MODE_ACTIVE,
+    CONNECTION_MODE_ADAPTIVE,
+    CONNECTION_MODE_PASSIVE,
+    DEFAULT_CAPTURE,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_CONNECTION_MODE,
+    DEFAULT_CONNECTION_SLOTS,
+    DEFAULT_DATA_TTL,
+    DEFAULT_LONG_TERM_STATISTICS,
+    DEFAULT_MAX_LATENCY,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_QUIET_PERIOD,
+    DEFAULT_REQUEST_FAMILIES,
+    DOMAIN,
+)
+from .discovery import (
+    Candidate,
+    DiscoveryIndex,
+    async_get_discovery_index,
+    async_release_discovery_index,
+    is_softener,
+)
 
 
 class WaterSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -20,7 +52,23 @@ class WaterSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self) -> None:
         """Initialize the config flow."""
         self._discovery_info: BluetoothServiceInfoBleak | None = None
-        self._discovered_devices = {}
+        self._discovered_devices: dict[str, Candidate] = {}
+        self._index: DiscoveryIndex | None = None
+
+    @callback
+    def async_remove(self) -> None:
+        """Release the discovery index when the flow ends."""
+        if self._index is not None:
+            self._index = None
+            async_release_discovery_index(self.hass)
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> WaterSoftenerOptionsFlow:
+        """Get the options flow for this handler."""
+        return WaterSoftenerOptionsFlow(config_entry)
 
     async def async_step_bluetooth(
         self, discovery_info: BluetoothServiceInfoBleak
@@ -28,12 +76,33 @@ class WaterSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle the bluetooth discovery step."""
         await self.async_set_unique_id(discovery_info.address)
         self._abort_if_unique_id_configured()
-        
-        if UART_SERVICE_UUID.lower() not in discovery_info.service_uuids:
+
+        # The service UUID matcher also finds other UART devices; only those
+        # named like a softener, or not named yet, are offered.
+        name = discovery_info.name
+        if not is_softener(name) and name != discovery_info.address:
             return self.async_abort(reason="not_supported")
 
         self._discovery_info = discovery_info
-        return await self.async_step_user()
+        self.context["title_placeholders"] = {"name": name}
+        return await self.async_step_bluetooth_confirm()
+
+    async def async_step_bluetooth_confirm(
+        self, user_input: dict | None = None
+    ) -> FlowResult:
+        """Confirm setting up a discovered device."""
+        assert self._discovery_info is not None
+        if user_input is not None:
+            return self.async_create_entry(
+                title=self._discovery_info.name,
+                data={CONF_ADDRESS: self._discovery_info.address},
+            )
+
+        self._set_confirm_only()
+        return self.async_show_form(
+            step_id="bluetooth_confirm",
+            description_placeholders={"name": self._discovery_info.name},
+        )
 
     async def async_step_user(
         self, user_input: dict | None = None
@@ -48,17 +117,14 @@ class WaterSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 data={CONF_ADDRESS: address},
             )
 
-        current_addresses = self._async_current_ids()
-        for discovery_info in async_discovered_service_info(self.hass):
-            address = discovery_info.address
-            if address in current_addresses or address in self._discovered_devices:
-                continue
-
-            if UART_SERVICE_UUID.lower() in discovery_info.service_uuids:
-                self._discovered_devices[address] = discovery_info
-
-        if not self._discovered_devices:
+        if self._index is None:
+            self._index = async_get_discovery_index(self.hass)
+        candidates = self._index.ranked(exclude=self._async_current_ids())
+        if not candidates:
             return self.async_abort(reason="no_devices_found")
+        self._discovered_devices = {
+            candidate.address: candidate for candidate in candidates
+        }
 
         return self.async_show_form(
             step_id="user",
@@ -66,10 +132,95 @@ class WaterSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 {
                     vol.Required(CONF_ADDRESS): vol.In(
                         {
-                            address: discovery.name
-                            for address, discovery in self._discovered_devices.items()
+                            candidate.address: candidate.label
+                            for candidate in candidates
                         }
                     )
                 }
             ),
         )
+
+
+class WaterSoftenerOptionsFlow(config_entries.OptionsFlow):
+    """Handle options for Bluetooth Water Softener."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._config_entry = config_entry
+
+    async def async_step_init(self, user_input: dict | None = None) -> FlowResult:
+        """Manage the options."""
+        errors = {}
+        if user_input is not None:
+            if user_input[CONF_MAX_LATENCY] < user_input[CONF_COALESCE_WINDOW]:
+                errors[CONF_MAX_LATENCY] = "max_latency_below_window"
+            else:
+                return self.async_create_entry(
+                    title="", data={**self._config_entry.options, **user_input}
+                )
+
+        options = self._config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_CONNECTION_MODE,
+                        default=options.get(
+                            CONF_CONNECTION_MODE, DEFAULT_CONNECTION_MODE
+                        ),
+                    ): vol.In(
+                        [
+                            CONNECTION_MODE_ACTIVE,
+                            CONNECTION_MODE_PASSIVE,
+                            CONNECTION_MODE_ADAPTIVE,
+                        ]
+                    ),
+                    vol.Required(
+                        CONF_POLL_INTERVAL,
+                        default=options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                    vol.Required(
+                        CONF_QUIET_PERIOD,
+                        default=options.get(CONF_QUIET_PERIOD, DEFAULT_QUIET_PERIOD),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+                    vol.Required(
+                        CONF_CONNECTION_SLOTS,
+                        default=options.get(
+                            CONF_CONNECTION_SLOTS, DEFAULT_CONNECTION_SLOTS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                    vol.Required(
+                        CONF_REQUEST_FAMILIES,
+                        default=options.get(
+                            CONF_REQUEST_FAMILIES, DEFAULT_REQUEST_FAMILIES
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_COALESCE_WINDOW,
+                        default=options.get(
+                            CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                    vol.Required(
+                        CONF_MAX_LATENCY,
+                        default=options.get(CONF_MAX_LATENCY, DEFAULT_MAX_LATENCY),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+                    vol.Required(
+                        CONF_DATA_TTL,
+                        default=options.get(CONF_DATA_TTL, DEFAULT_DATA_TTL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=720)),
+                    vol.Required(
+                        CONF_LONG_TERM_STATISTICS,
+                        default=options.get(
+                            CONF_LONG_TERM_STATISTICS, DEFAULT_LONG_TERM_STATISTICS
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_CAPTURE,
+                        default=options.get(CONF_CAPTURE, DEFAULT_CAPTURE),
+                    ): bool,
+                }
+            ),
+            errors=errors,
+        )
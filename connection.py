@@ -0,0 +1,322 @@
+"""Connection management for the Bluetooth Water Softener integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+import random
+import time
+
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
+from bleak_retry_connector import (
+    BleakClientWithServiceCache,
+    BleakNotFoundError,
+    establish_connection,
+)
+
+from homeassistant.components.bluetooth import async_ble_device_from_address
+from homeassistant.core import HomeAssistant, callback
+
+from .const import UART_RX_CHAR_UUID, UART_TX_CHAR_UUID
+from .paths import ConnectionPath, PathSelector
+from .scheduler import PRIORITY_COMMAND, PRIORITY_REFRESH, ConnectionSlotScheduler
+from .stats import CONNECT_BOUNDS, Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+BACKOFF_INITIAL = 2.0
+BACKOFF_MAX = 300.0
+SLOT_WAIT_TIMEOUT = 60.0
+DEFAULT_STALENESS_BUDGET = 60.0
+# Seconds and attempts a connect through one path may take before the next
+# best path is tried.
+PATH_CONNECT_TIMEOUT = 30.0
+PATH_ATTEMPTS = 2
+
+
+class WaterSoftenerConnection:
+    """Own the BLE client of one water softener.
+
+    The client is created through bleak-retry-connector so resolved GATT
+    services are cached across reconnects. While `keep_alive` is set, a lost
+    link is re-established immediately and then retried with exponential
+    backoff and jitter. Each connect goes through the best ranked scanner
+    and fails over to the next one.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        address: str,
+        notification_callback: Callable[[int, bytearray], None],
+        connected_callback: Callable[[], None] | None = None,
+        disconnected_callback: Callable[[], None] | None = None,
+        scheduler: ConnectionSlotScheduler | None = None,
+        slots: int = 1,
+    ) -> None:
+        """Initialize the connection."""
+        self.hass = hass
+        self.address = address
+        self.keep_alive = True
+        self._notification_callback = notification_callback
+        self._connected_callback = connected_callback
+        self._disconnected_callback = disconnected_callback
+        self._client: BleakClientWithServiceCache | None = None
+        self._connect_lock = asyncio.Lock()
+        self._reconnect_task: asyncio.Task | None = None
+        self._stopping = False
+        # Seconds without writes after which a link that is not kept alive
+        # is released.
+        self.idle_timeout: float | None = None
+        self._idle_handle: asyncio.TimerHandle | None = None
+        self.connect_count = 0
+        self.disconnect_count = 0
+        self.last_connect_duration: float | None = None
+        self.connect_durations = Histogram(CONNECT_BOUNDS)
+        self.connected_since: float | None = None
+        self.total_uptime = 0.0
+        # Seconds the data may go without a connection before this device
+        # should be preferred by the slot scheduler.
+        self.staleness_budget = DEFAULT_STALENESS_BUDGET
+        self._last_disconnected: float | None = None
+        self.paths = PathSelector(hass, address)
+        # Source of the scanner the current or last link went through.
+        self.path: str | None = None
+        self._scheduler = scheduler
+        if scheduler is not None:
+            scheduler.async_register(address, slots, self._async_preempt)
+
+    @property
+    def is_connected(self) -> bool:
+        """Return True if the client is connected."""
+        return self._client is not None and self._client.is_connected
+
+    @property
+    def uptime(self) -> float:
+        """Return the seconds the current link has been up."""
+        if self.connected_since is None:
+            return 0.0
+        return time.monotonic() - self.connected_since
+
+    def _ble_device(self) -> BLEDevice:
+        """Resolve the BLE device to connect through."""
+        device = async_ble_device_from_address(self.hass, self.address, connectable=True)
+        if not device:
+            raise BleakNotFoundError(f"Device not found: {self.address}")
+        return device
+
+    async def async_connect(
+        self, priority: int = PRIORITY_REFRESH
+    ) -> BleakClientWithServiceCache:
+        """Connect if needed and return the connected client."""
+        async with self._connect_lock:
+            if self._client is not None and self._client.is_connected:
+                return self._client
+
+            if self._scheduler is not None:
+                deadline = (self._last_disconnected or 0.0) + self.staleness_budget
+                async with asyncio.timeout(SLOT_WAIT_TIMEOUT):
+                    await self._scheduler.async_acquire(
+                        self.address, priority, deadline
+                    )
+
+            _LOGGER.debug("Connecting to %s", self.address)
+            started = time.monotonic()
+            try:
+                client = await self._async_establish()
+                if self._connected_callback:
+                    self._connected_callback()
+                try:
+                    await client.start_notify(
+                        UART_TX_CHAR_UUID, self._notification_callback
+                    )
+                except (BleakError, asyncio.TimeoutError):
+                    await client.disconnect()
+                    raise
+            except BaseException:
+                self._release_slot()
+                raise
+
+            self._client = client
+            self.connected_since = time.monotonic()
+            self.last_connect_duration = self.connected_since - started
+            self.connect_durations.record(self.last_connect_duration)
+            self.connect_count += 1
+            _LOGGER.debug(
+                "Connected to %s through %s in %.2fs and subscribed to notifications",
+                self.address,
+                self.path,
+                self.last_connect_duration,
+            )
+            return client
+
+    async def _async_establish(self) -> BleakClientWithServiceCache:
+        """Connect through the best path, failing over to the next ones."""
+        paths = self.paths.ranked()
+        if not paths:
+            # No scanner reports the device yet; let Home Assistant pick.
+            self.path = None
+            return await self._async_establish_through(None)
+        error: Exception | None = None
+        for path in paths:
+            try:
+                client = await self._async_establish_through(path)
+            except (BleakError, asyncio.TimeoutError) as err:
+                error = err
+                self.paths.record_failure(path.source)
+                _LOGGER.debug(
+                    "Connecting to %s through %s (%s dBm) failed: %s",
+                    self.address,
+                    path.name,
+                    path.rssi,
+                    err,
+                )
+                continue
+            self.paths.record_success(path.source)
+            self.path = path.source
+            return client
+        raise error
+
+    async def _async_establish_through(
+        self, path: ConnectionPath | None
+    ) -> BleakClientWithServiceCache:
+        """Connect through one path, bounded by PATH_CONNECT_TIMEOUT."""
+        async with asyncio.timeout(PATH_CONNECT_TIMEOUT):
+            return await establish_connection(
+                BleakClientWithServiceCache,
+                self._ble_device() if path is None else path.ble_device,
+                self.address,
+                disconnected_callback=self._on_disconnected,
+                use_services_cache=True,
+                ble_device_callback=(
+                    self._ble_device if path is None else lambda: path.ble_device
+                ),
+                max_attempts=PATH_ATTEMPTS,
+            )
+
+    async def async_write(self, data: bytes, priority: int = PRIORITY_COMMAND) -> None:
+        """Write to the UART RX characteristic, reconnecting once on failure."""
+        client = await self.async_connect(priority)
+        self.async_schedule_idle_disconnect()
+        try:
+            await client.write_gatt_char(UART_RX_CHAR_UUID, data, response=False)
+        except BleakError as err:
+            _LOGGER.debug("Write to %s failed, reconnecting: %s", self.address, err)
+            await self.async_disconnect()
+            client = await self.async_connect(priority)
+            await client.write_gatt_char(UART_RX_CHAR_UUID, data, response=False)
+
+    @callback
+    def async_schedule_idle_disconnect(self) -> None:
+        """Release the link after `idle_timeout` unless it is kept alive."""
+        self._cancel_idle_disconnect()
+        if self.keep_alive or self.idle_timeout is None:
+            return
+        self._idle_handle = self.hass.loop.call_later(
+            self.idle_timeout, self._async_idle_disconnect
+        )
+
+    @callback
+    def _async_idle_disconnect(self) -> None:
+        """Disconnect an idle link."""
+        self._idle_handle = None
+        if not self.keep_alive and self.is_connected:
+            _LOGGER.debug("Releasing idle connection to %s", self.address)
+            self.hass.async_create_task(self.async_disconnect())
+
+    def _cancel_idle_disconnect(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    async def async_disconnect(self) -> None:
+        """Disconnect the client, if any."""
+        self._cancel_idle_disconnect()
+        async with self._connect_lock:
+            client = self._client
+            self._mark_disconnected()
+            if client is not None:
+                await client.disconnect()
+
+    async def async_stop(self) -> None:
+        """Release the client and stop reconnecting."""
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        await self.async_disconnect()
+        if self._scheduler is not None:
+            self._scheduler.async_unregister(self.address)
+
+    def _mark_disconnected(self) -> None:
+        """Record the end of the current link."""
+        if self.connected_since is not None:
+            self.total_uptime += time.monotonic() - self.connected_since
+            self.connected_since = None
+            self._last_disconnected = self.hass.loop.time()
+        self._client = None
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.async_release(self.address)
+
+    @callback
+    def _async_preempt(self) -> None:
+        """Give the connection slot back to the scheduler."""
+        self.hass.async_create_task(self._async_yield_slot())
+
+    async def _async_yield_slot(self) -> None:
+        """Disconnect, then queue up again if the link is kept alive."""
+        await self.async_disconnect()
+        self._async_start_reconnect()
+
+    @callback
+    def _on_disconnected(self, client: BleakClientWithServiceCache) -> None:
+        """Handle the link dropping."""
+        if client is not self._client:
+            return
+        _LOGGER.debug(
+            "Disconnected from %s after %.0fs", self.address, self.uptime
+        )
+        self._mark_disconnected()
+        self.disconnect_count += 1
+        if self._disconnected_callback:
+            self._disconnected_callback()
+        self._async_start_reconnect()
+
+    @callback
+    def async_start(self) -> None:
+        """Connect in the background, retrying until the device is reachable."""
+        self._async_start_reconnect()
+
+    @callback
+    def _async_start_reconnect(self) -> None:
+        """Start reconnecting in the background if the link is kept alive."""
+        if self.keep_alive and not self._stopping and self._reconnect_task is None:
+            self._reconnect_task = self.hass.async_create_background_task(
+                self._async_reconnect(), f"{self.address} reconnect"
+            )
+
+    async def _async_reconnect(self) -> None:
+        """Reconnect immediately, then back off exponentially with jitter."""
+        delay = 0.0
+        try:
+            while self.keep_alive and not self._stopping:
+                if delay:
+                    await asyncio.sleep(random.uniform(delay / 2, delay))
+                try:
+                    await self.async_connect()
+                except (BleakError, asyncio.TimeoutError) as err:
+                    delay = min(BACKOFF_MAX, max(BACKOFF_INITIAL, delay * 2))
+                    _LOGGER.debug(
+                        "Reconnect to %s failed, retrying within %.0fs: %s",
+                        self.address,
+                        delay,
+                        err,
+                    )
+                else:
+                    return
+        finally:
+            self._reconnect_task = None
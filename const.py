@@ -7,11 +7,69 @@ UART_SERVICE_UUID = "6e400001-b5a3-f393-e0a9-e50e24dcca9e"
 UART_RX_CHAR_UUID = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
 UART_TX_CHAR_UUID = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
 
-# Command to trigger regeneration
-REGEN_NOW_COMMAND = b"\x72\x72\x01"
-
-# Command to set the salt level.
-# The format is: 0x76 0x76 <page> <setting_id> <value>
-# Based on the log, setting salt level seems to be page 1, setting_id 10.
-# The value is a single byte.
-SET_SALT_LEVEL_COMMAND_PREFIX = b"\x76\x76\x01\x0A"
+# Softeners advertise as CS_Meter_Soft; other devices may also offer the UART
+# service.
+LOCAL_NAME_PREFIX = "CS_Meter_Soft"
+
+# Options for coalescing notification bursts into a single state update.
+# The window is restarted by every frame; max latency bounds the total delay.
+CONF_COALESCE_WINDOW = "coalesce_window"
+CONF_MAX_LATENCY = "max_latency"
+DEFAULT_COALESCE_WINDOW = 0.5
+DEFAULT_MAX_LATENCY = 2.0
+
+# Validation of the trailing checksum byte of each frame. Neither sum8 nor
+# xor8 matches the captured sample frames, so they are only used with the
+# simulator and are not offered in the options.
+CONF_CHECKSUM = "checksum"
+CHECKSUM_NONE = "none"
+CHECKSUM_SUM8 = "sum8"
+CHECKSUM_XOR8 = "xor8"
+DEFAULT_CHECKSUM = CHECKSUM_NONE
+
+# In passive mode the device is only connected to on demand: on a schedule
+# to refresh slow-moving values, when data has gone stale, or for commands.
+CONF_CONNECTION_MODE = "connection_mode"
+CONNECTION_MODE_ACTIVE = "active"
+CONNECTION_MODE_PASSIVE = "passive"
+CONNECTION_MODE_ADAPTIVE = "adaptive"
+DEFAULT_CONNECTION_MODE = CONNECTION_MODE_ACTIVE
+CONF_POLL_INTERVAL = "poll_interval"
+DEFAULT_POLL_INTERVAL = 30  # minutes
+# Seconds without flow or regeneration after which an adaptive mode
+# connection is released.
+CONF_QUIET_PERIOD = "quiet_period"
+DEFAULT_QUIET_PERIOD = 120
+
+# Connection slots shared by all softeners, handed out by the scheduler
+# stored in hass.data[DOMAIN][DATA_SLOT_SCHEDULER].
+DATA_SLOT_SCHEDULER = "slot_scheduler"
+# Index of nearby softeners shared by config flows.
+DATA_DISCOVERY = "discovery"
+CONF_CONNECTION_SLOTS = "connection_slots"
+DEFAULT_CONNECTION_SLOTS = 3
+
+# Opt-in capture of raw notifications to <config>/water_softener_ble/.
+CONF_CAPTURE = "capture"
+DEFAULT_CAPTURE = False
+
+# Import hourly flow and usage as long-term statistics and write the raw
+# flow and usage states at most once per STATISTICS_STATE_INTERVAL seconds.
+CONF_LONG_TERM_STATISTICS = "long_term_statistics"
+DEFAULT_LONG_TERM_STATISTICS = False
+STATISTICS_STATE_INTERVAL = 60.0
+
+# Request each packet family on its own interval instead of waiting for
+# the device to push it. Off by default: the query opcodes are unverified.
+CONF_REQUEST_FAMILIES = "request_families"
+DEFAULT_REQUEST_FAMILIES = False
+
+# Hours after which a value that has not been received again is reported as
+# unavailable; 0 keeps values indefinitely.
+CONF_DATA_TTL = "data_ttl"
+DEFAULT_DATA_TTL = 24
+
+# Last known state, saved per config entry under .storage/.
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.{{entry_id}}"
+ATTR_RESTORED = "restored"
@@ -1,113 +1,640 @@
 """Data update coordinator for the Bluetooth Water Softener integration."""
 import asyncio
+from collections.abc import Iterable, Sequence
+from datetime import timedelta
 import logging
+import time
+from typing import Any
 
-from bleak import BleakClient
 from bleak.exc import BleakError
 
-from homeassistant.components.bluetooth import async_ble_device_from_address
-from homeassistant.core import HomeAssistant
+from homeassistant.components import bluetooth
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ADDRESS
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
+from .capture import CaptureWriter
 from .const import (
+    CONF_CAPTURE,
+    CONF_CHECKSUM,
+    CONF_COALESCE_WINDOW,
+    CONF_CONNECTION_MODE,
+    CONF_CONNECTION_SLOTS,
+    CONF_DATA_TTL,
+    CONF_LONG_TERM_STATISTICS,
+    CONF_MAX_LATENCY,
+    CONF_POLL_INTERVAL,
+    CONF_QUIET_PERIOD,
+    CONF_REQUEST_FAMILIES,
+    CONNECTION_MODE_ADAPTIVE,
+    CONNECTION_MODE_PASSIVE,
+    DEFAULT_CAPTURE,
+    DEFAULT_CHECKSUM,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_CONNECTION_MODE,
+    DEFAULT_CONNECTION_SLOTS,
+    DEFAULT_DATA_TTL,
+    DEFAULT_LONG_TERM_STATISTICS,
+    DEFAULT_MAX_LATENCY,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_QUIET_PERIOD,
+    DEFAULT_REQUEST_FAMILIES,
     DOMAIN,
-    UART_RX_CHAR_UUID,
-    UART_TX_CHAR_UUID,
-    REGEN_NOW_COMMAND,
-    SET_SALT_LEVEL_COMMAND_PREFIX,
+    STATISTICS_STATE_INTERVAL,
+    STORAGE_KEY,
+    STORAGE_VERSION,
 )
-from .parser import WaterSoftenerBluetoothDeviceData
+from .commands import Command, CommandQueue
+from .connection import WaterSoftenerConnection
+from .duty_cycle import DutyCyclePolicy
+from .flow_series import FlowSeries
+from .forecast import INPUT_KEYS as FORECAST_INPUT_KEYS, Forecaster
+from .framer import FrameReassembler
+from .long_term_statistics import HourlyStatistics
+from .parser import (
+    SETTINGS,
+    WaterSoftenerBluetoothDeviceData,
+    decode_setting_echo,
+    encode_command,
+    encode_setting,
+)
+from .queries import FamilyRequestScheduler
+from .scheduler import PRIORITY_COMMAND, async_get_scheduler
+from .stats import FrameStats
 
 _LOGGER = logging.getLogger(__name__)
 
+# Keys whose changes are published without waiting for the coalescing window.
+IMMEDIATE_KEYS = frozenset(
+    {"brine_tank_level", "days_until_regeneration", "firmware_version"}
+)
+
+# Seconds between the writes of a settings batch, so the device can echo
+# each one before the next arrives.
+SETTING_WRITE_INTERVAL = 0.25
+
+# Key announced to listeners when the adaptive connection policy changes state.
+DUTY_CYCLE_KEY = "connection_policy"
+
+# Packet families (by first header byte) a passive poll waits for: 'uu' for
+# the remaining capacity, 'vv' for the salt level and 'ww' for the totals.
+POLL_FAMILIES = frozenset(b"uvw")
+POLL_TIMEOUT = 20.0
+# Seconds a passive mode connection is kept after the last poll or command.
+PASSIVE_IDLE_TIMEOUT = 15.0
+CAPTURE_FLUSH_INTERVAL = timedelta(seconds=10)
+# Fields that expire sooner than the configured data TTL, in seconds: the
+# flow is meaningless once frames have stopped for a while.
+FIELD_TTLS = {"current_water_flow": 600.0}
+# Keys that never expire: the firmware version is only sent on connect and
+# settings are only echoed after a write, so their age says nothing.
+STATIC_KEYS = frozenset({"firmware_version", *SETTINGS})
+EXPIRY_CHECK_INTERVAL = timedelta(minutes=1)
+# Seconds between the first unsaved change and saving the last known state.
+STORE_SAVE_DELAY = 60.0
+# Keys feeding the flow series and the hourly statistics.
+USAGE_KEYS = frozenset(
+    {"current_water_flow", "treated_water_usage_today", "total_gallons_treated"}
+)
+# Keys not worth restoring because they are stale within seconds.
+VOLATILE_KEYS = frozenset({"current_water_flow"})
+
 
 class WaterSoftenerDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the water softener."""
 
-    def __init__(self, hass: HomeAssistant, address: str):
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         """Initialize the coordinator."""
+        mode = entry.options.get(CONF_CONNECTION_MODE, DEFAULT_CONNECTION_MODE)
+        self.passive = mode == CONNECTION_MODE_PASSIVE
+        self._poll_interval = timedelta(
+            minutes=entry.options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)
+        )
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
+            update_interval=self._poll_interval if self.passive else None,
+            # Snapshots compare by version, so unchanged refreshes are skipped.
+            always_update=False,
         )
-        self.address = address
+        self.entry = entry
+        self.address = entry.data[CONF_ADDRESS]
         self.parser = WaterSoftenerBluetoothDeviceData()
-        self._client: BleakClient | None = None
-        self._lock = asyncio.Lock()
+        self._store: Store[dict] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY.format(entry_id=entry.entry_id)
+        )
+        self._save_scheduled = False
+        # time.monotonic() of the restore; restored values age from there.
+        self._restored_at: float | None = None
+        self._ttl = entry.options.get(CONF_DATA_TTL, DEFAULT_DATA_TTL) * 3600.0
+        self._expired: set[str] = set()
+        self._unsub_expiry: CALLBACK_TYPE | None = None
+        self.framer = FrameReassembler(
+            self._handle_frame, entry.options.get(CONF_CHECKSUM, DEFAULT_CHECKSUM)
+        )
+        self.scheduler = async_get_scheduler(hass)
+        self.connection = WaterSoftenerConnection(
+            hass,
+            self.address,
+            self._notification_handler,
+            connected_callback=self._on_connected,
+            disconnected_callback=self._on_disconnected,
+            scheduler=self.scheduler,
+            slots=entry.options.get(CONF_CONNECTION_SLOTS, DEFAULT_CONNECTION_SLOTS),
+        )
+        if self.passive:
+            self.connection.keep_alive = False
+            self.connection.idle_timeout = PASSIVE_IDLE_TIMEOUT
+            self.connection.staleness_budget = self._poll_interval.total_seconds()
+        self.duty_cycle: DutyCyclePolicy | None = None
+        if mode == CONNECTION_MODE_ADAPTIVE:
+            self.duty_cycle = DutyCyclePolicy(
+                hass,
+                self.connection,
+                entry.options.get(CONF_QUIET_PERIOD, DEFAULT_QUIET_PERIOD),
+                self._poll_interval.total_seconds(),
+                lambda: self.async_update_key_listeners([DUTY_CYCLE_KEY]),
+            )
+        self.commands = CommandQueue(
+            hass, self.connection.async_write, self.connection.async_connect
+        )
+        self.requests: FamilyRequestScheduler | None = None
+        if entry.options.get(CONF_REQUEST_FAMILIES, DEFAULT_REQUEST_FAMILIES):
+            self.requests = FamilyRequestScheduler(
+                hass,
+                self.commands.async_submit,
+                lambda: self.connection.is_connected,
+            )
+        self.last_seen: float | None = None
+        self.rssi: int | None = None
+        self._last_poll: float | None = None
+        self._poll_seen: set[int] = set()
+        self._poll_done: asyncio.Event | None = None
+        self._unsub_advertisements: CALLBACK_TYPE | None = None
+        self.capture: CaptureWriter | None = None
+        self._unsub_capture_flush: CALLBACK_TYPE | None = None
+        if entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE):
+            self.capture = CaptureWriter(
+                hass.config.path(DOMAIN, f"{self.address.replace(':', '')}.bin")
+            )
+        self._key_listeners: dict[str, list[CALLBACK_TYPE]] = {}
+        self._coalesce_window: float = entry.options.get(
+            CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW
+        )
+        self._max_latency: float = entry.options.get(
+            CONF_MAX_LATENCY, DEFAULT_MAX_LATENCY
+        )
+        self.flow_series = FlowSeries()
+        self.forecast = Forecaster()
+        self.hourly: HourlyStatistics | None = None
+        if entry.options.get(
+            CONF_LONG_TERM_STATISTICS, DEFAULT_LONG_TERM_STATISTICS
+        ):
+            self.hourly = HourlyStatistics(
+                hass, self.address, self.forecast.expected_usage
+            )
+            # The hourly statistics carry the detail; flow starts and stops
+            # and the IMMEDIATE_KEYS are still written right away.
+            self._coalesce_window = max(
+                self._coalesce_window, STATISTICS_STATE_INTERVAL
+            )
+            self._max_latency = max(self._max_latency, STATISTICS_STATE_INTERVAL)
+        self._pending_keys: set[str] = set()
+        self._pending_since: float | None = None
+        self._last_frame: float = 0.0
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flowing = False
+        self.stats = FrameStats()
+        # perf_counter() of the notification being handled, and of the
+        # first notification whose changes are still pending.
+        self._notified_at = 0.0
+        self._pending_received = 0.0
 
-    async def _async_update_data(self):
-        """Fetch data from the device."""
-        async with self._lock:
-            if not self._client or not self._client.is_connected:
-                await self._connect()
+    async def async_restore(self) -> None:
+        """Load the last known state so entities start with values."""
+        stored = await self._store.async_load()
+        if stored:
+            self.parser.restore(stored.get("data", {}))
+            self._restored_at = time.monotonic()
+            self.forecast.load(stored.get("forecast", {}))
+            self.forecast.update(self.parser.data, [], time.time())
+            if self.hourly is not None:
+                self.hourly.load(stored.get("history", {}))
+        self.data = self.parser.snapshot()
 
-            return self.parser.data
+    def is_restored(self, key: str) -> bool:
+        """Return True if a value is restored and not yet confirmed by the device."""
+        return key in self.parser.data and key not in self.parser.received
 
-    async def _connect(self):
-        """Connect to the BLE device."""
-        _LOGGER.debug("Connecting to %s", self.address)
-        device = async_ble_device_from_address(self.hass, self.address)
-        if not device:
-            raise UpdateFailed(f"Device not found: {self.address}")
+    def is_fresh(self, key: str) -> bool:
+        """Return False if a value has outlived its TTL."""
+        if not self._ttl or key in STATIC_KEYS or key not in self.parser.data:
+            return True
+        received = self.parser.received.get(key, self._restored_at)
+        if received is None:
+            return True
+        ttl = min(FIELD_TTLS.get(key, self._ttl), self._ttl)
+        return time.monotonic() - received < ttl
 
-        self._client = BleakClient(device)
-        try:
-            await self._client.connect()
-            await self._client.start_notify(
-                UART_TX_CHAR_UUID, self._notification_handler
+    def _data_to_store(self) -> dict:
+        """Return the last known state to save."""
+        self._save_scheduled = False
+        return {
+            "data": {
+                key: value
+                for key, value in self.parser.data.items()
+                if key not in VOLATILE_KEYS
+            },
+            "forecast": self.forecast.as_dict(),
+            "history": self.hourly.as_dict() if self.hourly is not None else {},
+        }
+
+    @callback
+    def async_start(self) -> None:
+        """Connect in the background and start listening for advertisements."""
+        if self._ttl:
+            self._unsub_expiry = async_track_time_interval(
+                self.hass, self._async_check_expiry, EXPIRY_CHECK_INTERVAL
             )
-            _LOGGER.debug("Connected and subscribed to notifications")
+        if self.capture is not None:
+            self._unsub_capture_flush = async_track_time_interval(
+                self.hass, self._async_flush_capture, CAPTURE_FLUSH_INTERVAL
+            )
+        if self.hourly is not None:
+            self.hourly.async_start()
+        if self.passive:
+            self._unsub_advertisements = bluetooth.async_register_callback(
+                self.hass,
+                self._async_handle_advertisement,
+                bluetooth.BluetoothCallbackMatcher(address=self.address),
+                bluetooth.BluetoothScanningMode.PASSIVE,
+            )
+        elif self.duty_cycle is not None:
+            self.duty_cycle.async_start()
+        else:
+            self.connection.async_start()
+
+    @callback
+    def _on_connected(self) -> None:
+        """Prepare for the frames of a new connection."""
+        self.framer.reset()
+        if self.requests is not None and not self.passive:
+            if self.hourly is not None:
+                # Read the lifetime counters at once to backfill any gap.
+                self.requests.async_invalidate(b"ww")
+            self.requests.async_start()
+        if self.duty_cycle is not None:
+            self.duty_cycle.async_connected()
+
+    @callback
+    def _on_disconnected(self) -> None:
+        """Let the adaptive policy decide when to reconnect."""
+        if self.duty_cycle is not None:
+            self.duty_cycle.async_disconnected()
+
+    @callback
+    def _async_handle_advertisement(
+        self,
+        service_info: bluetooth.BluetoothServiceInfoBleak,
+        change: bluetooth.BluetoothChange,
+    ) -> None:
+        """Track presence and refresh stale data when the device is seen."""
+        self.last_seen = self.hass.loop.time()
+        self.rssi = service_info.rssi
+        if self._is_stale() and self._poll_done is None:
+            self.hass.async_create_task(self.async_request_refresh())
+
+    def _is_stale(self) -> bool:
+        """Return True if the last poll is older than the poll interval."""
+        return (
+            self._last_poll is None
+            or self.hass.loop.time() - self._last_poll
+            > self._poll_interval.total_seconds()
+        )
+
+    async def _async_update_data(self):
+        """Fetch data from the device."""
+        try:
+            if self.passive:
+                await self._async_poll()
+            else:
+                await self.connection.async_connect()
         except (BleakError, asyncio.TimeoutError) as e:
             raise UpdateFailed(f"Failed to connect: {e}")
 
+        return self.parser.snapshot()
+
+    async def _async_poll(self) -> None:
+        """Connect briefly and wait for the slow-moving packet families."""
+        self._poll_seen.clear()
+        self._poll_done = asyncio.Event()
+        try:
+            await self.connection.async_connect()
+            if self.requests is not None:
+                self.requests.async_start()
+            try:
+                async with asyncio.timeout(POLL_TIMEOUT):
+                    await self._poll_done.wait()
+            except asyncio.TimeoutError:
+                _LOGGER.debug(
+                    "Poll of %s ended before all packet families arrived",
+                    self.address,
+                )
+            self._last_poll = self.hass.loop.time()
+        finally:
+            self._poll_done = None
+            if self.requests is not None:
+                self.requests.async_stop()
+            self.connection.async_schedule_idle_disconnect()
+
+    @callback
+    def async_add_key_listener(
+        self, key: str, update_callback: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Listen for changes to a single data key."""
+        listeners = self._key_listeners.setdefault(key, [])
+        listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            listeners.remove(update_callback)
+            if not listeners:
+                del self._key_listeners[key]
+
+        return remove_listener
+
+    @callback
+    def async_update_key_listeners(self, keys: Iterable[str]) -> None:
+        """Notify the listeners of the given keys, each at most once."""
+        notified: set[CALLBACK_TYPE] = set()
+        for key in keys:
+            for update_callback in self._key_listeners.get(key, ()):
+                if update_callback not in notified:
+                    notified.add(update_callback)
+                    update_callback()
+
     def _notification_handler(self, sender: int, data: bytearray):
         """Handle incoming BLE notifications."""
-        _LOGGER.debug("Received notification: %s", data.hex())
-        parsed_data = self.parser.parse_data(data)
-        if parsed_data:
-            self.async_set_updated_data(parsed_data)
+        self._notified_at = time.perf_counter()
+        if self.capture is not None:
+            self.capture.append(data)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Received notification: %s", data.hex())
+        self.framer.feed(data)
+
+    def _handle_frame(self, frame: memoryview) -> None:
+        """Handle a complete, validated frame."""
+        if self._poll_done is not None:
+            self._poll_seen.add(frame[0])
+            if self._poll_seen >= POLL_FAMILIES:
+                self._poll_done.set()
+        if (echo := decode_setting_echo(frame)) is not None:
+            self.commands.async_setting_echo(echo)
+        stats = self.stats
+        stats.record_frame(frame[0])
+        if self.requests is not None:
+            self.requests.seen(frame)
+        now = time.time()
+        self.forecast.tick(now)
+        self.flow_series.heard(now)
+        if self.hourly is not None:
+            self.hourly.heard(now)
+        started = time.perf_counter()
+        changed = self.parser.update(frame)
+        stats.parse_time.record(time.perf_counter() - started)
+        if self._expired and changed is not None:
+            changed += self._revived()
+        if not changed:
+            if changed is None:
+                stats.parse_failures += 1
+            return
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._data_to_store, STORE_SAVE_DELAY)
+        if not USAGE_KEYS.isdisjoint(changed):
+            self._record_usage(changed)
+        if not FORECAST_INPUT_KEYS.isdisjoint(changed):
+            changed += self.forecast.update(self.parser.data, changed, time.time())
+
+        if self.data is None or not self.last_update_success:
+            # Availability changes need every entity to write its state.
+            self._cancel_flush()
+            self._pending_keys.clear()
+            self.async_set_updated_data(self.parser.snapshot())
+            stats.state_latency.record(time.perf_counter() - self._notified_at)
+            return
+
+        if not self._pending_keys:
+            self._pending_received = self._notified_at
+        self._pending_keys.update(changed)
+        if self._coalesce_window <= 0 or self._is_immediate(changed):
+            self._flush_pending()
+            return
+
+        now = self.hass.loop.time()
+        self._last_frame = now
+        if self._pending_since is None:
+            self._pending_since = now
+            self._flush_handle = self.hass.loop.call_at(
+                now + self._coalesce_window, self._async_flush_due
+            )
+
+    def _record_usage(self, changed: list[str]) -> None:
+        """Feed flow and usage changes to the time series and statistics."""
+        data = self.parser.data
+        now = time.time()
+        if "current_water_flow" in changed:
+            flow = data["current_water_flow"]
+            self.flow_series.add(now, flow)
+            if self.requests is not None:
+                self.requests.async_set_flowing(bool(flow))
+            if self.duty_cycle is not None:
+                self.duty_cycle.async_set_flowing(bool(flow))
+            if self.hourly is not None:
+                self.hourly.record_flow(flow, now)
+        if self.hourly is None:
+            return
+        if "treated_water_usage_today" in changed:
+            self.hourly.record_usage(data["treated_water_usage_today"], now)
+        if "total_gallons_treated" in changed:
+            self.hourly.record_total(data["total_gallons_treated"], now)
+
+    def _is_immediate(self, changed: list[str]) -> bool:
+        """Return True if the changed keys must be published right away."""
+        if "current_water_flow" in changed:
+            flowing = bool(self.parser.data["current_water_flow"])
+            if flowing != self._flowing:
+                self._flowing = flowing
+                return True
+        return not IMMEDIATE_KEYS.isdisjoint(changed)
+
+    @callback
+    def _async_flush_due(self) -> None:
+        """Flush pending keys once the window has passed without new frames."""
+        self._flush_handle = None
+        if self._pending_since is None:
+            return
+        due = min(
+            self._last_frame + self._coalesce_window,
+            self._pending_since + self._max_latency,
+        )
+        if due > self.hass.loop.time():
+            self._flush_handle = self.hass.loop.call_at(due, self._async_flush_due)
+            return
+        self._flush_pending()
+
+    @callback
+    def _flush_pending(self) -> None:
+        """Notify the listeners of all keys changed since the last flush."""
+        self._cancel_flush()
+        pending = self._pending_keys
+        if not pending:
+            return
+        self._pending_keys = set()
+        self.data = self.parser.snapshot()
+        self.async_update_key_listeners(pending)
+        self.stats.state_latency.record(time.perf_counter() - self._pending_received)
+
+    @callback
+    def _async_check_expiry(self, now=None) -> None:
+        """Make entities whose value outlived its TTL unavailable."""
+        expired = [
+            key
+            for key in self.parser.data
+            if key not in self._expired and not self.is_fresh(key)
+        ]
+        if expired:
+            _LOGGER.debug("Values of %s expired: %s", self.address, expired)
+            self._expired.update(expired)
+            self.async_update_key_listeners(expired)
+
+    def _revived(self) -> list[str]:
+        """Return expired keys that were received again."""
+        revived = [key for key in self._expired if self.is_fresh(key)]
+        self._expired.difference_update(revived)
+        return revived
+
+    def _cancel_flush(self) -> None:
+        """Cancel the scheduled flush and reset the window."""
+        self._pending_since = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    async def async_stop(self) -> None:
+        """Stop the coordinator when the config entry is unloaded."""
+        if self._unsub_advertisements is not None:
+            self._unsub_advertisements()
+            self._unsub_advertisements = None
+        self._cancel_flush()
+        if self.requests is not None:
+            self.requests.async_stop()
+        if self.duty_cycle is not None:
+            self.duty_cycle.async_stop()
+        if self.hourly is not None:
+            self.hourly.async_stop()
+        await self.commands.async_stop()
+        await self.connection.async_stop()
+        if self._unsub_expiry is not None:
+            self._unsub_expiry()
+            self._unsub_expiry = None
+        if self._unsub_capture_flush is not None:
+            self._unsub_capture_flush()
+            self._unsub_capture_flush = None
+        if self.capture is not None:
+            await self._async_flush_capture()
+        if self._save_scheduled or self.hourly is not None:
+            # Save now so a reload restores the latest state and the
+            # history watermark.
+            await self._store.async_save(self._data_to_store())
+
+    async def _async_flush_capture(self, now=None) -> None:
+        """Write buffered capture records from the executor."""
+        try:
+            await self.hass.async_add_executor_job(
+                self.capture.write, self.capture.take()
+            )
+        except OSError as err:
+            _LOGGER.warning("Failed to write capture of %s: %s", self.address, err)
 
     async def regenerate_now(self):
         """Send the 'Regenerate Now' command."""
-        async with self._lock:
-            if not self._client or not self._client.is_connected:
-                await self._connect()
-            
-            try:
-                _LOGGER.debug("Sending 'Regenerate Now' command")
-                await self._client.write_gatt_char(
-                    UART_RX_CHAR_UUID, REGEN_NOW_COMMAND, response=False
-                )
-            except BleakError as e:
-                _LOGGER.error("Failed to send command: %s", e)
-                await self._connect_and_retry(
-                    self._client.write_gatt_char, UART_RX_CHAR_UUID, REGEN_NOW_COMMAND, response=False
-                )
+        if self.duty_cycle is not None:
+            self.duty_cycle.async_regeneration_started()
+        await self.commands.async_submit(
+            Command("Regenerate Now", encode_command("regenerate_now"), retries=0)
+        )
 
     async def set_salt_level(self, level: int):
         """Send the command to set the salt level."""
-        command = SET_SALT_LEVEL_COMMAND_PREFIX + level.to_bytes(1, 'big')
-        async with self._lock:
-            if not self._client or not self._client.is_connected:
-                await self._connect()
-            
-            try:
-                _LOGGER.debug("Sending 'Set Salt Level' command: %s", command.hex())
-                await self._client.write_gatt_char(
-                    UART_RX_CHAR_UUID, command, response=False
-                )
-            except BleakError as e:
-                _LOGGER.error("Failed to send command: %s", e)
-                await self._connect_and_retry(
-                    self._client.write_gatt_char, UART_RX_CHAR_UUID, command, response=False
-                )
+        await self.async_write_setting("brine_tank_level", level)
 
-    async def _connect_and_retry(self, func, *args, **kwargs):
-        """Attempt to reconnect and retry a BLE command."""
-        try:
-            await self._connect()
-            await func(*args, **kwargs)
-        except BleakError as e:
-            _LOGGER.error("Failed to send command after reconnect: %s", e)
+    async def async_write_setting(self, key: str, value: int) -> None:
+        """Write a setting and wait for the device to echo it back."""
+        page, setting_id = SETTINGS[key]
+        await self.commands.async_submit(
+            Command(
+                f"Set {key}",
+                encode_setting(key, value),
+                key=(page, setting_id),
+                expect=(page, setting_id, value),
+            )
+        )
 
+    async def async_apply_settings(
+        self, writes: Sequence[tuple[int, int, int]]
+    ) -> list[dict[str, Any]]:
+        """Write a batch of (page, setting_id, value) settings in one session.
+
+        Every write is confirmed by the device's 'vv' echo of the new value.
+        The batch stops at the first write that is not confirmed; the
+        remaining settings are reported as skipped.
+        """
+        names = {location: key for key, location in SETTINGS.items()}
+        try:
+            await self.connection.async_connect(PRIORITY_COMMAND)
+        except (BleakError, asyncio.TimeoutError) as err:
+            raise HomeAssistantError(
+                f"Failed to connect to {self.address}: {err}"
+            ) from err
+        results: list[dict[str, Any]] = []
+        failed = False
+        for page, setting_id, value in writes:
+            result: dict[str, Any] = {
+                "page": page,
+                "setting_id": setting_id,
+                "key": names.get((page, setting_id)),
+                "value": value,
+            }
+            results.append(result)
+            if failed:
+                result["status"] = "skipped"
+                continue
+            if len(results) > 1:
+                await asyncio.sleep(SETTING_WRITE_INTERVAL)
+            try:
+                await self.commands.async_submit(
+                    Command(
+                        f"Set page {page} setting {setting_id}",
+                        encode_command(
+                            "write_setting",
+                            page=page,
+                            setting_id=setting_id,
+                            value=value,
+                        ),
+                        key=(page, setting_id),
+                        expect=(page, setting_id, value),
+                    )
+                )
+            except HomeAssistantError as err:
+                failed = True
+                result["status"] = "failed"
+                result["error"] = str(err)
+            else:
+                result["status"] = "applied"
+        return results
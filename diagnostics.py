@@ -0,0 +1,101 @@
+"""Diagnostics support for the Bluetooth Water Softener integration."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ADDRESS
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import WaterSoftenerDataUpdateCoordinator
+
+TO_REDACT = {CONF_ADDRESS}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: WaterSoftenerDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    connection = coordinator.connection
+    framer = coordinator.framer
+    commands = coordinator.commands
+    scheduler = coordinator.scheduler
+    wait_stats = scheduler.wait_stats.get(coordinator.address)
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "data": dict(coordinator.data or {}),
+        "data_version": getattr(coordinator.data, "version", None),
+        "restored": sorted(
+            key for key in coordinator.data or {} if coordinator.is_restored(key)
+        ),
+        "expired": sorted(
+            key for key in coordinator.data or {} if not coordinator.is_fresh(key)
+        ),
+        "last_update_success": coordinator.last_update_success,
+        "frames": coordinator.stats.as_dict(),
+        "framer": {
+            "frames": framer.frames,
+            "corrupt_frames": framer.corrupt_frames,
+            "discarded_bytes": framer.discarded_bytes,
+        },
+        "connection": {
+            "connected": connection.is_connected,
+            "connect_count": connection.connect_count,
+            "disconnect_count": connection.disconnect_count,
+            "last_connect_duration": connection.last_connect_duration,
+            "connect_duration": connection.connect_durations.as_dict(),
+            "uptime": connection.uptime,
+            "total_uptime": connection.total_uptime,
+            "rssi": coordinator.rssi,
+            "path": connection.path,
+            "paths": connection.paths.as_dict(),
+        },
+        "commands": {
+            "last_round_trip": commands.last_round_trip,
+            "round_trip": commands.round_trips.as_dict(),
+            "failures": commands.failures,
+        },
+        "requests_sent": (
+            coordinator.requests.requests_sent
+            if coordinator.requests is not None
+            else None
+        ),
+        "forecast": {
+            "predictions": coordinator.forecast.predictions,
+            "weekly_usage": coordinator.forecast.usage.weekly,
+            "salt_per_regeneration": coordinator.forecast.salt_per_regeneration,
+            "regeneration_interval": coordinator.forecast.regeneration_interval,
+        },
+        "hourly_statistics": (
+            {
+                "pending_hours": len(coordinator.hourly.pending),
+                "history": coordinator.hourly.as_dict(),
+            }
+            if coordinator.hourly is not None
+            else None
+        ),
+        "scheduler": {
+            "slots": scheduler.slots,
+            "in_use": scheduler.in_use,
+            "wait": asdict(wait_stats) if wait_stats is not None else None,
+        },
+        "duty_cycle": (
+            {
+                "state": duty_cycle.state,
+                "flowing": duty_cycle.flowing,
+                "active": duty_cycle.active,
+                "idle_backoff": duty_cycle.idle_interval,
+                "releases": duty_cycle.releases,
+            }
+            if (duty_cycle := coordinator.duty_cycle) is not None
+            else None
+        ),
+    }
@@ -0,0 +1,139 @@
+"""Incremental index of nearby water softeners.
+
+The Bluetooth manager does the filtering: a callback registered for the
+Nordic UART service is replayed with the devices already seen and then
+called for every new advertisement of a matching device, so picking a
+device never walks all advertisements in range. The index lives as long
+as a config flow uses it.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Container
+from dataclasses import dataclass
+import time
+
+from homeassistant.components import bluetooth
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_DISCOVERY, DOMAIN, LOCAL_NAME_PREFIX, UART_SERVICE_UUID
+
+# Seconds after which a candidate that stopped advertising is dropped.
+CANDIDATE_TIMEOUT = 900.0
+
+
+def is_softener(name: str | None) -> bool:
+    """Return True if a local name is that of a CS_Meter_Soft unit."""
+    return bool(name) and name.startswith(LOCAL_NAME_PREFIX)
+
+
+@dataclass(slots=True)
+class Candidate:
+    """A device that may be a water softener."""
+
+    address: str
+    name: str
+    rssi: int
+    softener: bool
+    last_seen: float
+
+    @property
+    def label(self) -> str:
+        """Return the label shown in the device picker."""
+        kind = "" if self.softener else ", other UART device"
+        return f"{self.name} ({self.address}, {self.rssi} dBm{kind})"
+
+
+class DiscoveryIndex:
+    """Candidates keyed by address, ranked by kind and signal strength."""
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.candidates: dict[str, Candidate] = {}
+        # Flows using the index, and the advertisement subscriptions.
+        self.users = 0
+        self.unsubscribe: list[Callable[[], None]] = []
+
+    @callback
+    def async_update(
+        self,
+        service_info: bluetooth.BluetoothServiceInfoBleak,
+        change: bluetooth.BluetoothChange,
+    ) -> None:
+        """Add or refresh a candidate from an advertisement."""
+        name = service_info.name
+        if (candidate := self.candidates.get(service_info.address)) is not None:
+            candidate.rssi = service_info.rssi
+            candidate.last_seen = time.monotonic()
+            if name != candidate.name and name != service_info.address:
+                # The local name often only arrives with a scan response.
+                candidate.name = name
+                candidate.softener = is_softener(name)
+            return
+        self.candidates[service_info.address] = Candidate(
+            address=service_info.address,
+            name=name,
+            rssi=service_info.rssi,
+            softener=is_softener(name),
+            last_seen=time.monotonic(),
+        )
+
+    def ranked(self, exclude: Container[str] = frozenset()) -> list[Candidate]:
+        """Return current candidates, softeners first, strongest signal first."""
+        cutoff = time.monotonic() - CANDIDATE_TIMEOUT
+        for address in [
+            address
+            for address, candidate in self.candidates.items()
+            if candidate.last_seen < cutoff
+        ]:
+            del self.candidates[address]
+        return sorted(
+            (
+                candidate
+                for address, candidate in self.candidates.items()
+                if address not in exclude
+            ),
+            key=lambda candidate: (not candidate.softener, -candidate.rssi),
+        )
+
+
+@callback
+def async_get_discovery_index(hass: HomeAssistant) -> DiscoveryIndex:
+    """Return the shared index, subscribing it to advertisements on first use.
+
+    Every call must be paired with async_release_discovery_index.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (index := domain_data.get(DATA_DISCOVERY)) is None:
+        index = domain_data[DATA_DISCOVERY] = DiscoveryIndex()
+        for matcher in (
+            bluetooth.BluetoothCallbackMatcher(
+                local_name=f"{LOCAL_NAME_PREFIX}*", connectable=True
+            ),
+            bluetooth.BluetoothCallbackMatcher(
+                service_uuid=UART_SERVICE_UUID, connectable=True
+            ),
+        ):
+            index.unsubscribe.append(
+                bluetooth.async_register_callback(
+                    hass,
+                    index.async_update,
+                    matcher,
+                    bluetooth.BluetoothScanningMode.ACTIVE,
+                )
+            )
+    index.users += 1
+    return index
+
+
+@callback
+def async_release_discovery_index(hass: HomeAssistant) -> None:
+    """Release the shared index; the last user unsubscribes and drops it."""
+    domain_data = hass.data.get(DOMAIN, {})
+    if (index := domain_data.get(DATA_DISCOVERY)) is None:
+        return
+    index.users -= 1
+    if index.users > 0:
+        return
+    for unsubscribe in index.unsubscribe:
+        unsubscribe()
+    del domain_data[DATA_DISCOVERY]
@@ -0,0 +1,226 @@
+"""Flow-aware connection duty cycling.
+
+In adaptive mode the link is only held while something is happening: water
+flowing or a regeneration running. While active the connection is kept alive
+like in active mode, so a dropped link is re-established at once. Once the
+softener has been quiet for the quiet period the link is released and then
+re-established on a backoff schedule, from one minute up to the poll
+interval while nothing happens. A command needs the link and connects at
+once; the connection then stays up for another quiet period.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+
+from bleak.exc import BleakError
+
+from homeassistant.core import HomeAssistant, callback
+
+from .connection import WaterSoftenerConnection
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED_ACTIVE = "connected_active"
+STATE_CONNECTED_QUIET = "connected_quiet"
+STATE_IDLE_DISCONNECTED = "idle_disconnected"
+STATES = (
+    STATE_CONNECTING,
+    STATE_CONNECTED_ACTIVE,
+    STATE_CONNECTED_QUIET,
+    STATE_IDLE_DISCONNECTED,
+)
+
+# Seconds until the first check-in after the link was released.
+IDLE_RECONNECT_INITIAL = 60.0
+# Seconds a regeneration is assumed to run after it was started; the device
+# does not report its regeneration status.
+REGENERATION_HOLD = 2 * 3600.0
+
+
+class DutyCyclePolicy:
+    """Hold the link while water flows or the softener regenerates."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        connection: WaterSoftenerConnection,
+        quiet_period: float,
+        max_idle_interval: float,
+        state_callback: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize the policy."""
+        self.hass = hass
+        self._connection = connection
+        self.quiet_period = quiet_period
+        self.max_idle_interval = max(max_idle_interval, IDLE_RECONNECT_INITIAL)
+        self._state_callback = state_callback
+        self.state = STATE_IDLE_DISCONNECTED
+        self.flowing = False
+        self._regenerating_until = 0.0
+        self.idle_interval = IDLE_RECONNECT_INITIAL
+        self._handle: asyncio.TimerHandle | None = None
+        self._regeneration_handle: asyncio.TimerHandle | None = None
+        self._wake_task: asyncio.Task | None = None
+        self._stopping = False
+        self.releases = 0
+        connection.keep_alive = False
+
+    @property
+    def active(self) -> bool:
+        """Return True if water flows or a regeneration is running."""
+        return self.flowing or self.hass.loop.time() < self._regenerating_until
+
+    @callback
+    def async_start(self) -> None:
+        """Connect for the first time."""
+        self._async_wake()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop cycling the link."""
+        self._stopping = True
+        self._cancel_timer()
+        if self._regeneration_handle is not None:
+            self._regeneration_handle.cancel()
+            self._regeneration_handle = None
+        if self._wake_task is not None:
+            self._wake_task.cancel()
+            self._wake_task = None
+
+    @callback
+    def async_set_flowing(self, flowing: bool) -> None:
+        """Track whether water is flowing."""
+        if flowing != self.flowing:
+            self.flowing = flowing
+            self._async_evaluate()
+
+    @callback
+    def async_regeneration_started(self) -> None:
+        """Hold the link while a regeneration that was just started runs."""
+        now = self.hass.loop.time()
+        self._regenerating_until = now + REGENERATION_HOLD
+        if self._regeneration_handle is not None:
+            self._regeneration_handle.cancel()
+        self._regeneration_handle = self.hass.loop.call_at(
+            self._regenerating_until, self._async_regeneration_ended
+        )
+        self._async_evaluate()
+
+    @callback
+    def _async_regeneration_ended(self) -> None:
+        self._regeneration_handle = None
+        self._async_evaluate()
+
+    @callback
+    def async_connected(self) -> None:
+        """Handle the link coming up, for a check-in or for a command."""
+        if self._stopping:
+            return
+        self._cancel_timer()
+        if self.active:
+            self._set_state(STATE_CONNECTED_ACTIVE)
+        else:
+            self._async_quiet()
+
+    @callback
+    def async_disconnected(self) -> None:
+        """Handle the link dropping."""
+        if self._stopping:
+            return
+        if self._connection.keep_alive:
+            # The connection reconnects on its own while active.
+            self._set_state(STATE_CONNECTING)
+            return
+        self._async_idle()
+
+    @callback
+    def _async_evaluate(self) -> None:
+        """Switch between holding the link and counting down the quiet period."""
+        if self._stopping:
+            return
+        active = self.active
+        self._connection.keep_alive = active
+        if active:
+            self.idle_interval = IDLE_RECONNECT_INITIAL
+            if self._connection.is_connected:
+                self._cancel_timer()
+                self._set_state(STATE_CONNECTED_ACTIVE)
+            elif self.state == STATE_IDLE_DISCONNECTED:
+                self._async_wake()
+        elif self.state == STATE_CONNECTED_ACTIVE:
+            self._async_quiet()
+
+    @callback
+    def _async_quiet(self) -> None:
+        """Release the link unless activity resumes within the quiet period."""
+        self._set_state(STATE_CONNECTED_QUIET)
+        self._schedule(self.quiet_period, self._async_release)
+
+    @callback
+    def _async_release(self) -> None:
+        """Disconnect after the quiet period."""
+        self._handle = None
+        if self.active:
+            return
+        _LOGGER.debug(
+            "%s quiet for %.0fs, disconnecting",
+            self._connection.address,
+            self.quiet_period,
+        )
+        self.releases += 1
+        self.hass.async_create_task(self._connection.async_disconnect())
+        self._async_idle()
+
+    @callback
+    def _async_idle(self) -> None:
+        """Wait for the next check-in, backing off while nothing happens."""
+        self._set_state(STATE_IDLE_DISCONNECTED)
+        self._schedule(self.idle_interval, self._async_wake)
+        self.idle_interval = min(self.max_idle_interval, self.idle_interval * 2)
+
+    @callback
+    def _async_wake(self) -> None:
+        """Connect for a check-in."""
+        self._handle = None
+        if self._stopping or self._wake_task is not None:
+            return
+        self._set_state(STATE_CONNECTING)
+        self._wake_task = self.hass.async_create_background_task(
+            self._async_connect(), f"{self._connection.address} check-in"
+        )
+
+    async def _async_connect(self) -> None:
+        try:
+            await self._connection.async_connect()
+        except (BleakError, asyncio.TimeoutError) as err:
+            _LOGGER.debug(
+                "Check-in with %s failed, retrying within %.0fs: %s",
+                self._connection.address,
+                self.idle_interval,
+                err,
+            )
+            self._wake_task = None
+            if not self._connection.keep_alive:
+                self._async_idle()
+            else:
+                self._connection.async_start()
+        else:
+            self._wake_task = None
+
+    def _schedule(self, delay: float, action) -> None:
+        self._cancel_timer()
+        self._handle = self.hass.loop.call_later(delay, action)
+
+    def _cancel_timer(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            if self._state_callback is not None:
+                self._state_callback()
@@ -0,0 +1,42 @@
+"""Base entity for the Bluetooth Water Softener integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import ATTR_RESTORED
+from .coordinator import WaterSoftenerDataUpdateCoordinator
+
+
+class WaterSoftenerEntity(CoordinatorEntity[WaterSoftenerDataUpdateCoordinator]):
+    """An entity backed by a single key of the coordinator data.
+
+    Notifications only write the state of entities whose key changed; full
+    coordinator updates (connects, failures) still reach every entity.
+    Values restored from the last run are flagged until the device confirms
+    them, and entities go unavailable once their value outlives its TTL.
+    """
+
+    @property
+    def available(self) -> bool:
+        """Return True if the value is still fresh enough to report."""
+        return super().available and self.coordinator.is_fresh(
+            self.entity_description.key
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to changes of this entity's key."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_key_listener(
+                self.entity_description.key, self._handle_coordinator_update
+            )
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Flag a value restored from the last run."""
+        if self.coordinator.is_restored(self.entity_description.key):
+            return {ATTR_RESTORED: True}
+        return None
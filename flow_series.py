@@ -0,0 +1,205 @@
+"""Fixed-size, high-resolution flow time series.
+
+Raw (timestamp, flow) samples go into a ring buffer and are downsampled
+incrementally into 1 second, 1 minute and 15 minute tiers of min/max/mean,
+each its own ring buffer. All storage is preallocated `array`s, so memory
+is bounded and inserts are O(1) however long the integration runs.
+A silence longer than a tier's buckets, such as a lost link, is left out
+of that tier rather than filled with the last flow.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+import math
+
+# Raw samples kept: 30 minutes at 10 frames per second.
+RAW_CAPACITY = 18000
+# (name, bucket width in seconds, buckets kept)
+TIERS = (
+    ("1s", 1.0, 3600),
+    ("1min", 60.0, 1440),
+    ("15min", 900.0, 2880),
+)
+RESOLUTION_RAW = "raw"
+RESOLUTIONS = (RESOLUTION_RAW, *(name for name, _, _ in TIERS))
+
+
+class _Ring:
+    """Parallel preallocated arrays used as a ring buffer.
+
+    The first column holds timestamps in ascending order.
+    """
+
+    __slots__ = ("capacity", "columns", "_next", "count")
+
+    def __init__(self, capacity: int, typecodes: str) -> None:
+        self.capacity = capacity
+        self.columns = tuple(
+            array(code, bytes(array(code).itemsize * capacity)) for code in typecodes
+        )
+        self._next = 0
+        self.count = 0
+
+    def append(self, *values: float) -> None:
+        index = self._next
+        for column, value in zip(self.columns, values):
+            column[index] = value
+        self._next = (index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def window(self, start: float, end: float) -> list[tuple[float, ...]]:
+        """Return the rows with start <= timestamp < end, oldest first."""
+        oldest = (self._next - self.count) % self.capacity
+        if oldest + self.count <= self.capacity:
+            segments = ((oldest, oldest + self.count),)
+        else:
+            segments = ((oldest, self.capacity), (0, self._next))
+        times = self.columns[0]
+        rows = []
+        for low, high in segments:
+            first = bisect_left(times, start, low, high)
+            last = bisect_left(times, end, first, high)
+            rows.extend(zip(*(column[first:last] for column in self.columns)))
+        return rows
+
+
+class _Tier:
+    """Time-weighted min/max/mean of the flow in fixed-width buckets."""
+
+    __slots__ = (
+        "width",
+        "ring",
+        "_start",
+        "_since",
+        "_integral",
+        "_covered",
+        "_min",
+        "_max",
+    )
+
+    def __init__(self, width: float, capacity: int) -> None:
+        self.width = width
+        self.ring = _Ring(capacity, "dfff")
+        self._start: float | None = None
+        # Time the flow was last accounted until.
+        self._since = 0.0
+        self._integral = 0.0
+        self._covered = 0.0
+        self._min = 0.0
+        self._max = 0.0
+
+    def hold(self, value: float, until: float) -> None:
+        """Account for `value` being the flow from the last call until `until`."""
+        width = self.width
+        since = self._since
+        while until >= self._start + width:
+            end = self._start + width
+            self._add(value, end - max(since, self._start))
+            self._close()
+            if until - end >= width * self.ring.capacity:
+                # Skip gaps longer than the ring holds.
+                end = until - until % width - width * (self.ring.capacity - 1)
+            self._open(end)
+        self._add(value, until - max(since, self._start))
+        self._since = until
+
+    def resume(self, at: float) -> None:
+        """Continue from `at`, leaving the time before it out."""
+        width = self.width
+        if self._start is not None and at >= self._start + width:
+            self._close()
+            self._start = None
+        if self._start is None:
+            self._open(at - at % width)
+        self._since = at
+
+    def sample(self, value: float) -> None:
+        """Include a new value in the open bucket's range."""
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+
+    def _open(self, start: float) -> None:
+        # The range starts empty: only flows held for some time in the
+        # bucket, or sampled in it, count towards its min/max.
+        self._start = start
+        self._integral = 0.0
+        self._covered = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+
+    def _add(self, value: float, elapsed: float) -> None:
+        if elapsed > 0:
+            self._integral += value * elapsed
+            self._covered += elapsed
+            self.sample(value)
+
+    def _close(self) -> None:
+        if self._covered:
+            self.ring.append(
+                self._start, self._min, self._max, self._integral / self._covered
+            )
+
+    def window(self, start: float, end: float) -> list[tuple[float, ...]]:
+        """Return closed buckets in the window, then the open one if it matches."""
+        rows = self.ring.window(start, end)
+        if self._covered and start <= self._start < end:
+            rows.append(
+                (self._start, self._min, self._max, self._integral / self._covered)
+            )
+        return rows
+
+
+class FlowSeries:
+    """Raw flow samples and their downsampled tiers."""
+
+    def __init__(self) -> None:
+        """Preallocate the buffers."""
+        # Timestamps as float64, flows as float32.
+        self.raw = _Ring(RAW_CAPACITY, "df")
+        self.tiers = {name: _Tier(width, capacity) for name, width, capacity in TIERS}
+        self._last_time: float | None = None
+        self._last_flow = 0.0
+
+    def heard(self, timestamp: float) -> None:
+        """Record a frame from the device.
+
+        A silence before it longer than a tier's buckets is left out of that
+        tier instead of holding the last flow across it.
+        """
+        if self._last_time is None:
+            return
+        timestamp = max(timestamp, self._last_time)
+        silence = timestamp - self._last_time
+        for tier in self.tiers.values():
+            if silence > tier.width:
+                tier.hold(self._last_flow, self._last_time)
+                tier.resume(timestamp)
+        self._last_time = timestamp
+
+    def add(self, timestamp: float, flow: float) -> None:
+        """Add a sample; the previous flow is taken to hold until now."""
+        if self._last_time is not None:
+            # Keep the rings sorted if the wall clock steps back.
+            timestamp = max(timestamp, self._last_time)
+            for tier in self.tiers.values():
+                tier.hold(self._last_flow, timestamp)
+                tier.sample(flow)
+        else:
+            for tier in self.tiers.values():
+                tier.resume(timestamp)
+                tier.sample(flow)
+        self.raw.append(timestamp, flow)
+        self._last_time = timestamp
+        self._last_flow = flow
+
+    def window(
+        self, start: float, end: float, resolution: str = RESOLUTION_RAW
+    ) -> list[tuple[float, ...]]:
+        """Return (timestamp, flow) samples or (start, min, max, mean) buckets."""
+        if resolution == RESOLUTION_RAW:
+            return self.raw.window(start, end)
+        return self.tiers[resolution].window(start, end)
@@ -0,0 +1,337 @@
+"""Capacity and salt depletion forecasting.
+
+Water usage is modelled as an exponentially weighted moving average per
+hour of the week, updated once per completed hour. Salt use per
+regeneration and the time between regenerations are EWMAs updated when
+the regeneration counter advances. Every update is O(1); predictions are
+recomputed only when one of their inputs changes, by walking at most two
+weeks of hourly slots.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+import homeassistant.util.dt as dt_util
+
+HOUR = 3600.0
+SLOTS = 7 * 24
+WEEK = SLOTS * HOUR
+# Weight of the newest hour in its weekday/hour slot, so roughly the last
+# five weeks count.
+USAGE_ALPHA = 0.2
+# Weight of the newest regeneration in the salt and interval averages.
+REGENERATION_ALPHA = 0.3
+
+# Parser keys the forecasts depend on.
+INPUT_KEYS = frozenset(
+    {
+        "soft_water_remaining",
+        "treated_water_usage_today",
+        "days_until_regeneration",
+        "regeneration_time",
+        "brine_tank_level",
+        "total_regenerations",
+    }
+)
+CAPACITY_EXHAUSTED = "capacity_exhausted"
+NEXT_REGENERATION = "next_regeneration"
+SALT_REFILL_DATE = "salt_refill_date"
+# Parser keys each prediction cannot be made without.
+PREDICTION_INPUTS = {
+    CAPACITY_EXHAUSTED: frozenset({"soft_water_remaining"}),
+    NEXT_REGENERATION: frozenset({"regeneration_time"}),
+    SALT_REFILL_DATE: frozenset({"brine_tank_level", "total_regenerations"}),
+}
+
+
+class UsageModel:
+    """Gallons used per hour of the week, as EWMAs.
+
+    Slots without data yet are predicted with the mean of the known ones.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the model."""
+        self.rates = array("d", bytes(8 * SLOTS))
+        self.seen = array("B", bytes(SLOTS))
+        self._seen_total = 0.0
+        self._seen_count = 0
+
+    def update(self, slot: int, usage: float) -> None:
+        """Blend the usage of a completed hour into its slot."""
+        old = self.rates[slot]
+        if self.seen[slot]:
+            new = old + USAGE_ALPHA * (usage - old)
+        else:
+            new = usage
+            self.seen[slot] = 1
+            self._seen_count += 1
+        self.rates[slot] = new
+        self._seen_total += new - old
+
+    def expected(self, slot: int) -> float:
+        """Return the expected usage of a slot."""
+        if self.seen[slot]:
+            return self.rates[slot]
+        return self._seen_total / self._seen_count if self._seen_count else 0.0
+
+    @property
+    def weekly(self) -> float:
+        """Return the expected usage of a whole week."""
+        if not self._seen_count:
+            return 0.0
+        return self._seen_total * SLOTS / self._seen_count
+
+    def time_until(
+        self, amount: float, slot: int, now: float, hour_end: float
+    ) -> float | None:
+        """Return the unix time by which `amount` gallons will have been used."""
+        if amount <= 0:
+            return now
+        weekly = self.weekly
+        if weekly <= 0:
+            return None
+        # Skip whole weeks, then walk the slots.
+        weeks = max(0, int(amount // weekly) - 1)
+        amount -= weeks * weekly
+        start = now + weeks * WEEK
+        end = hour_end + weeks * WEEK
+        for _ in range(2 * SLOTS + 1):
+            rate = self.expected(slot) / HOUR
+            expected = rate * (end - start)
+            if expected >= amount:
+                return start + amount / rate
+            amount -= expected
+            start = end
+            end += HOUR
+            slot = (slot + 1) % SLOTS
+        return None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the model for storage."""
+        return {"rates": list(self.rates), "seen": list(self.seen)}
+
+    def load(self, stored: Mapping[str, Any]) -> None:
+        """Restore a stored model."""
+        rates, seen = stored.get("rates", ()), stored.get("seen", ())
+        if len(rates) != SLOTS or len(seen) != SLOTS:
+            return
+        self.rates = array("d", rates)
+        self.seen = array("B", seen)
+        self._seen_count = sum(self.seen)
+        self._seen_total = sum(r for r, s in zip(self.rates, self.seen) if s)
+
+
+def _ewma(old: float | None, sample: float, alpha: float) -> float:
+    return sample if old is None else old + alpha * (sample - old)
+
+
+class Forecaster:
+    """Predict capacity exhaustion, the next regeneration and salt refill."""
+
+    def __init__(self) -> None:
+        """Initialize the forecaster."""
+        self.usage = UsageModel()
+        self.salt_per_regeneration: float | None = None
+        self.regeneration_interval: float | None = None
+        self.last_regeneration: float | None = None
+        self.predictions: dict[str, datetime | date | None] = {
+            CAPACITY_EXHAUSTED: None,
+            NEXT_REGENERATION: None,
+            SALT_REFILL_DATE: None,
+        }
+        self._hour_end = 0.0
+        self._slot = 0
+        self._hour_usage = 0.0
+        self._hour_seen = False
+        self._usage_today: float | None = None
+        self._regenerations: int | None = None
+        # Salt level and regeneration count at the last salt sample.
+        self._salt_level: float | None = None
+        self._salt_regenerations: int | None = None
+
+    def tick(self, now: float) -> None:
+        """Close the current hour into the usage model if `now` is past it.
+
+        Called for every frame so hours without any usage count as well. An
+        hour is only learned from if the usage counter was known when it
+        started and frames arrived until it ended.
+        """
+        if now < self._hour_end:
+            return
+        if self._hour_seen and now < self._hour_end + HOUR:
+            self.usage.update(self._slot, self._hour_usage)
+        local = dt_util.as_local(dt_util.utc_from_timestamp(now))
+        self._slot = local.weekday() * 24 + local.hour
+        self._hour_end = (
+            now + HOUR - (local.minute * 60 + local.second + local.microsecond / 1e6)
+        )
+        self._hour_usage = 0.0
+        self._hour_seen = self._usage_today is not None
+
+    def expected_usage(self, timestamp: float) -> float:
+        """Return the gallons expected in the hour of the week of a time."""
+        local = dt_util.as_local(dt_util.utc_from_timestamp(timestamp))
+        return self.usage.expected(local.weekday() * 24 + local.hour)
+
+    def update(
+        self, data: Mapping[str, Any], changed: list[str], now: float
+    ) -> list[str]:
+        """Update the models with changed inputs; return the changed predictions."""
+        self.tick(now)
+        if "treated_water_usage_today" in changed:
+            usage_today = data["treated_water_usage_today"]
+            if self._usage_today is not None:
+                # The counter restarts from zero at midnight.
+                if usage_today >= self._usage_today:
+                    self._hour_usage += usage_today - self._usage_today
+                else:
+                    self._hour_usage += usage_today
+            self._usage_today = usage_today
+        if "total_regenerations" in changed:
+            self._record_regenerations(data["total_regenerations"], now)
+        if "brine_tank_level" in changed or "total_regenerations" in changed:
+            self._record_salt(
+                data.get("brine_tank_level"), data.get("total_regenerations")
+            )
+        return self._predict(data, now)
+
+    def _record_regenerations(self, regenerations: int, now: float) -> None:
+        previous = self._regenerations
+        self._regenerations = regenerations
+        if previous is None or regenerations <= previous:
+            return
+        if self.last_regeneration is not None:
+            self.regeneration_interval = _ewma(
+                self.regeneration_interval,
+                (now - self.last_regeneration) / (regenerations - previous),
+                REGENERATION_ALPHA,
+            )
+        self.last_regeneration = now
+
+    def _record_salt(self, level: float | None, regenerations: int | None) -> None:
+        if level is None or regenerations is None:
+            return
+        if self._salt_level is None or level > self._salt_level:
+            # First reading or a refill: start measuring from here.
+            self._salt_level = level
+            self._salt_regenerations = regenerations
+            return
+        cycles = regenerations - self._salt_regenerations
+        used = self._salt_level - level
+        if cycles > 0 and used > 0:
+            self.salt_per_regeneration = _ewma(
+                self.salt_per_regeneration, used / cycles, REGENERATION_ALPHA
+            )
+            self._salt_level = level
+            self._salt_regenerations = regenerations
+
+    def _predict(self, data: Mapping[str, Any], now: float) -> list[str]:
+        """Recompute the predictions and return the keys that changed."""
+        exhausted = None
+        if (remaining := data.get("soft_water_remaining")) is not None:
+            exhausted = self.usage.time_until(
+                remaining, self._slot, now, self._hour_end
+            )
+        next_regeneration = self._next_regeneration(data, now, exhausted)
+        refill = self._salt_refill(data, now, next_regeneration)
+
+        new = {
+            CAPACITY_EXHAUSTED: (
+                dt_util.utc_from_timestamp(round(exhausted / 60) * 60)
+                if exhausted is not None
+                else None
+            ),
+            NEXT_REGENERATION: (
+                dt_util.utc_from_timestamp(next_regeneration)
+                if next_regeneration is not None
+                else None
+            ),
+            SALT_REFILL_DATE: refill,
+        }
+        changed = [key for key, value in new.items() if self.predictions[key] != value]
+        self.predictions = new
+        return changed
+
+    def _next_regeneration(
+        self, data: Mapping[str, Any], now: float, exhausted: float | None
+    ) -> float | None:
+        """Return the next regeneration by the calendar or by capacity."""
+        try:
+            hour, minute = map(int, data["regeneration_time"].split(":"))
+        except (KeyError, AttributeError, ValueError):
+            return None
+        local_now = dt_util.as_local(dt_util.utc_from_timestamp(now))
+
+        def at(day: date) -> float:
+            return datetime.combine(
+                day, time(hour, minute), local_now.tzinfo
+            ).timestamp()
+
+        candidates = []
+        if (days := data.get("days_until_regeneration")) is not None:
+            calendar = at(local_now.date() + timedelta(days=days))
+            if calendar <= now:
+                calendar = at(local_now.date() + timedelta(days=days + 1))
+            candidates.append(calendar)
+        if exhausted is not None:
+            # The softener regenerates in the night before it would run out.
+            exhausted_on = dt_util.as_local(
+                dt_util.utc_from_timestamp(exhausted)
+            ).date()
+            by_capacity = at(exhausted_on)
+            if by_capacity > exhausted:
+                by_capacity = at(exhausted_on - timedelta(days=1))
+            if by_capacity <= now:
+                by_capacity = at(local_now.date())
+                if by_capacity <= now:
+                    by_capacity = at(local_now.date() + timedelta(days=1))
+            candidates.append(by_capacity)
+        return min(candidates, default=None)
+
+    def _salt_refill(
+        self, data: Mapping[str, Any], now: float, next_regeneration: float | None
+    ) -> date | None:
+        """Return the day the salt runs out at the learned rates."""
+        level = data.get("brine_tank_level")
+        if (
+            level is None
+            or not self.salt_per_regeneration
+            or not self.regeneration_interval
+        ):
+            return None
+        regenerations = int(level // self.salt_per_regeneration)
+        if regenerations <= 0:
+            when = now
+        elif next_regeneration is not None:
+            when = next_regeneration + (regenerations - 1) * self.regeneration_interval
+        else:
+            when = now + regenerations * self.regeneration_interval
+        return dt_util.as_local(dt_util.utc_from_timestamp(when)).date()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the learned state for storage."""
+        return {
+            "usage": self.usage.as_dict(),
+            "salt_per_regeneration": self.salt_per_regeneration,
+            "regeneration_interval": self.regeneration_interval,
+            "last_regeneration": self.last_regeneration,
+            "regenerations": self._regenerations,
+            "salt_level": self._salt_level,
+            "salt_regenerations": self._salt_regenerations,
+        }
+
+    def load(self, stored: Mapping[str, Any]) -> None:
+        """Restore the learned state."""
+        self.usage.load(stored.get("usage", {}))
+        self.salt_per_regeneration = stored.get("salt_per_regeneration")
+        self.regeneration_interval = stored.get("regeneration_interval")
+        self.last_regeneration = stored.get("last_regeneration")
+        # Counters seen before the restart, so a regeneration in between is
+        # still counted and the salt use keeps its reference point.
+        self._regenerations = stored.get("regenerations")
+        self._salt_level = stored.get("salt_level")
+        self._salt_regenerations = stored.get("salt_regenerations")
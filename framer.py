@@ -0,0 +1,146 @@
+"""Reassembly of packet frames from the Nordic UART notification stream."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+import re
+
+from .const import CHECKSUM_NONE, CHECKSUM_SUM8, CHECKSUM_XOR8
+from .parser import PACKET_FAMILIES, PacketFamily
+
+_LOGGER = logging.getLogger(__name__)
+
+BUFFER_SIZE = 512
+
+
+def _checksum_sum8(frame) -> int:
+    """Return the 8-bit sum of the frame, excluding the checksum byte."""
+    return sum(frame[:-1]) & 0xFF
+
+
+def _checksum_xor8(frame) -> int:
+    """Return the 8-bit xor of the frame, excluding the checksum byte."""
+    value = 0
+    for byte in frame[:-1]:
+        value ^= byte
+    return value
+
+
+CHECKSUMS: dict[str, Callable[[memoryview], int] | None] = {
+    CHECKSUM_NONE: None,
+    CHECKSUM_SUM8: _checksum_sum8,
+    CHECKSUM_XOR8: _checksum_xor8,
+}
+
+
+class FrameReassembler:
+    """Incremental framer for notification data.
+
+    Notifications may carry a partial frame or several frames at once. Bytes
+    are appended to a preallocated buffer, which is compacted in place when
+    the write position reaches its end. Complete frames are handed to
+    `on_frame` as memoryviews into the buffer, so they are only valid for the
+    duration of the callback. Frames failing the checksum are counted and
+    dropped, and the stream is resynchronized on the next known header.
+    """
+
+    def __init__(
+        self,
+        on_frame: Callable[[memoryview], None],
+        checksum: str = CHECKSUM_NONE,
+        families: tuple[PacketFamily, ...] = PACKET_FAMILIES,
+        size: int = BUFFER_SIZE,
+    ) -> None:
+        """Initialize the framer."""
+        self._on_frame = on_frame
+        self._checksum = CHECKSUMS[checksum]
+        self._lengths = {
+            family.header[0] << 8 | family.header[1]: family.frame_length
+            for family in families
+        }
+        self._header_re = re.compile(
+            b"|".join(re.escape(family.header) for family in families)
+        )
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self.frames = 0
+        self.corrupt_frames = 0
+        self.discarded_bytes = 0
+
+    def reset(self) -> None:
+        """Drop any partial frame, e.g. after a reconnect."""
+        self.discarded_bytes += self._end - self._start
+        self._start = self._end = 0
+
+    def feed(self, data) -> None:
+        """Feed the payload of one notification."""
+        size = len(data)
+        if self._start == self._end and size >= 2:
+            # Fast path: a notification holding exactly one frame is passed
+            # through without being copied into the buffer.
+            if self._lengths.get(data[0] << 8 | data[1]) == size:
+                self._emit(data if type(data) is memoryview else memoryview(data))
+                return
+
+        offset = 0
+        capacity = len(self._buffer)
+        while offset < size:
+            if self._end == capacity:
+                self._compact()
+                if self._end == capacity:
+                    # No complete frame fits in the buffer; start over.
+                    self.reset()
+            chunk = min(size - offset, capacity - self._end)
+            self._view[self._end : self._end + chunk] = data[offset : offset + chunk]
+            self._end += chunk
+            offset += chunk
+            self._drain()
+
+    def _drain(self) -> None:
+        """Emit every complete frame in the buffer."""
+        buffer = self._buffer
+        while self._end - self._start >= 2:
+            start = self._start
+            length = self._lengths.get(buffer[start] << 8 | buffer[start + 1])
+            if length is None:
+                self._resync(start + 1)
+                continue
+            if self._end - start < length:
+                break
+            frame = self._view[start : start + length]
+            if self._emit(frame):
+                self._start = start + length
+            else:
+                self._resync(start + 1)
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def _emit(self, frame: memoryview) -> bool:
+        """Validate a frame and hand it to the callback."""
+        if self._checksum is not None and self._checksum(frame) != frame[-1]:
+            self.corrupt_frames += 1
+            _LOGGER.debug("Dropping frame with bad checksum: %s", frame.hex())
+            return False
+        self.frames += 1
+        self._on_frame(frame)
+        return True
+
+    def _resync(self, position: int) -> None:
+        """Skip ahead to the next known header at or after position."""
+        match = self._header_re.search(self._buffer, position, self._end)
+        # Without a full two-byte header everything is dropped; keeping a
+        # trailing byte that looks like half a header would misalign the
+        # frame in the next notification when it is a stray byte.
+        new_start = match.start() if match is not None else self._end
+        self.discarded_bytes += new_start - self._start
+        self._start = new_start
+
+    def _compact(self) -> None:
+        """Move the unconsumed bytes to the front of the buffer."""
+        pending = self._end - self._start
+        if self._start:
+            self._view[:pending] = self._view[self._start : self._end]
+            self._start = 0
+            self._end = pending
@@ -0,0 +1,334 @@
+"""Hourly water flow and usage statistics imported in batches.
+
+Instead of having the recorder store every flow and usage state and compile
+statistics from them, flow is integrated and usage summed into hourly
+buckets in-process. Completed buckets are imported as external statistics
+once an hour.
+
+Usage while the softener was out of reach is recovered from its lifetime
+counter: the counter value at the last 'ww' frame is kept as a watermark,
+and after a gap the usage the watermark does not account for is spread
+over the missed hours instead of landing in the hour of the reconnect.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import logging
+from typing import Any
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.const import UnitOfVolume
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_utc_time_change
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = 3600.0
+# Seconds without frames after which the usage in between is backfilled
+# from the lifetime counter.
+HISTORY_GAP = 900.0
+# Hours a gap is backfilled over at most; older usage goes to the first one.
+MAX_BACKFILL_HOURS = 31 * 24
+
+
+@dataclass(slots=True)
+class HourBucket:
+    """Aggregates of one completed hour."""
+
+    start: float
+    flow_mean: float | None
+    flow_min: float | None
+    flow_max: float | None
+    usage: float
+    usage_today: float | None
+    # Reconstructed from the lifetime counter; may replace an imported hour.
+    backfill: bool = False
+
+
+class HourlyStatistics:
+    """Aggregate flow and usage of one softener into hourly buckets.
+
+    Recording is O(1) per change: flow is integrated over time as a step
+    function, usage is the sum of increments of the daily usage counter.
+    Gaps are weighted by `hour_weight`, the expected usage of an hour.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        address: str,
+        hour_weight: Callable[[float], float] | None = None,
+    ) -> None:
+        """Initialize the aggregator."""
+        self.hass = hass
+        slug = address.replace(":", "").lower()
+        self.flow_statistic_id = f"{DOMAIN}:{slug}_water_flow"
+        self.usage_statistic_id = f"{DOMAIN}:{slug}_water_usage"
+        self._name = f"Water Softener {address}"
+        self._hour_start: float | None = None
+        self._flow: float | None = None
+        self._flow_since = 0.0
+        self._flow_integral = 0.0
+        self._observed = 0.0
+        self._flow_min: float | None = None
+        self._flow_max: float | None = None
+        self._usage = 0.0
+        self._usage_today: float | None = None
+        self.pending: list[HourBucket] = []
+        # Running usage sum and start of the last imported hour, loaded from
+        # the recorder so restarts continue the series.
+        self._sum: float | None = None
+        self._last_imported = 0.0
+        self._unsub_hourly: CALLBACK_TYPE | None = None
+        self._hour_weight = hour_weight
+        # Unix time of the last frame and the lifetime counter at the last
+        # 'ww' frame; usage is the difference between consecutive counters.
+        self._heard: float | None = None
+        self._watermark: float | None = None
+        self._gap_start: float | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Load the last imported sum and import completed hours hourly."""
+        if "recorder" not in self.hass.config.components:
+            _LOGGER.warning(
+                "The recorder is not loaded; water usage statistics are not imported"
+            )
+            return
+        self._unsub_hourly = async_track_utc_time_change(
+            self.hass, self._async_hour_passed, minute=0, second=10
+        )
+        self.hass.async_create_background_task(
+            self._async_load_sum(), f"{self.usage_statistic_id} load"
+        )
+
+    async def _async_load_sum(self) -> None:
+        """Continue the usage sum from the last imported statistic."""
+        last = await get_instance(self.hass).async_add_executor_job(
+            get_last_statistics,
+            self.hass,
+            1,
+            self.usage_statistic_id,
+            True,
+            {"sum"},
+        )
+        if rows := last.get(self.usage_statistic_id):
+            self._sum = rows[0].get("sum") or 0.0
+            self._last_imported = rows[0]["start"]
+        else:
+            self._sum = 0.0
+        self.async_import()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the hourly import and import the completed hours."""
+        if self._unsub_hourly is not None:
+            self._unsub_hourly()
+            self._unsub_hourly = None
+        self.async_import()
+
+    def heard(self, now: float) -> None:
+        """Record a frame; a long silence before it starts a gap."""
+        if self._heard is not None and now - self._heard > HISTORY_GAP:
+            if self._gap_start is None:
+                self._gap_start = self._heard
+        self._heard = now
+
+    def record_flow(self, flow: float, now: float) -> None:
+        """Record a change of the current flow."""
+        self._roll(now)
+        if self._flow is not None:
+            elapsed = now - self._flow_since
+            self._flow_integral += self._flow * elapsed
+            self._observed += elapsed
+        self._flow = flow
+        self._flow_since = now
+        if self._flow_min is None or flow < self._flow_min:
+            self._flow_min = flow
+        if self._flow_max is None or flow > self._flow_max:
+            self._flow_max = flow
+
+    def record_usage(self, usage_today: float, now: float) -> None:
+        """Record a change of today's usage counter as the hour's state."""
+        self._roll(now)
+        self._usage_today = usage_today
+
+    def record_total(self, total: float, now: float) -> None:
+        """Record the lifetime usage counter and import its increase.
+
+        The increase since the previous 'ww' frame is added to the current
+        hour, or spread over a preceding gap.
+        """
+        if self._watermark is not None and total > self._watermark:
+            used = total - self._watermark
+            if self._gap_start is not None:
+                _LOGGER.debug(
+                    "Backfilling %.0f gallons used since %s",
+                    used,
+                    datetime.fromtimestamp(self._gap_start, timezone.utc),
+                )
+                self._backfill(self._gap_start, now, used)
+            else:
+                self._roll(now)
+                self._usage += used
+        self._gap_start = None
+        self._watermark = total
+
+    def _backfill(self, start: float, end: float, amount: float) -> None:
+        """Spread usage over the whole hours of a gap and the current hour."""
+        self._roll(end)
+        current = self._hour_start
+        first = max(start - start % HOUR + HOUR, current - MAX_BACKFILL_HOURS * HOUR)
+        spans = [(hour, HOUR) for hour in range(int(first), int(current), int(HOUR))]
+        spans.append((current, end - max(current, start)))
+        weight = self._hour_weight
+        weights = [
+            (weight(hour) if weight is not None else 1.0) * span
+            for hour, span in spans
+        ]
+        if sum(weights) <= 0:
+            weights = [span for _, span in spans]
+        total_weight = sum(weights) or 1.0
+        by_start = {bucket.start: bucket for bucket in self.pending}
+        for (hour, _), share in zip(spans[:-1], weights):
+            usage = amount * share / total_weight
+            if (bucket := by_start.get(hour)) is not None:
+                bucket.usage += usage
+                bucket.backfill = True
+            else:
+                self.pending.append(
+                    HourBucket(
+                        start=hour,
+                        flow_mean=None,
+                        flow_min=None,
+                        flow_max=None,
+                        usage=usage,
+                        usage_today=None,
+                        backfill=True,
+                    )
+                )
+        self.pending.sort(key=lambda bucket: bucket.start)
+        self._usage += amount * weights[-1] / total_weight
+        self.async_import()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the watermark for storage."""
+        return {
+            "heard": self._heard,
+            "watermark": self._watermark,
+        }
+
+    def load(self, stored: Mapping[str, Any]) -> None:
+        """Restore the watermark, so a restart counts as a gap."""
+        self._heard = stored.get("heard")
+        self._watermark = stored.get("watermark")
+
+    def _roll(self, now: float) -> None:
+        """Close the current hour if `now` is past it."""
+        if self._hour_start is None:
+            self._hour_start = now - now % HOUR
+            return
+        end = self._hour_start + HOUR
+        if now < end:
+            return
+        if self._flow is not None:
+            elapsed = end - self._flow_since
+            self._flow_integral += self._flow * elapsed
+            self._observed += elapsed
+        self.pending.append(
+            HourBucket(
+                start=self._hour_start,
+                flow_mean=(
+                    self._flow_integral / self._observed if self._observed else None
+                ),
+                flow_min=self._flow_min,
+                flow_max=self._flow_max,
+                usage=self._usage,
+                usage_today=self._usage_today,
+            )
+        )
+        self._hour_start = now - now % HOUR
+        self._flow_integral = 0.0
+        self._observed = 0.0
+        self._usage = 0.0
+        if self._hour_start > end:
+            # Nothing was heard for over an hour; the flow is unknown.
+            self._flow = None
+            self._flow_min = self._flow_max = None
+        else:
+            self._flow_since = end
+            self._flow_min = self._flow_max = self._flow
+
+    @callback
+    def _async_hour_passed(self, now: datetime) -> None:
+        """Close the last hour and import it."""
+        if self._hour_start is not None:
+            self._roll(now.timestamp())
+        self.async_import()
+
+    @callback
+    def async_import(self) -> None:
+        """Import the completed hours as one batch per statistic."""
+        if self._sum is None or not self.pending:
+            return
+        flow: list[StatisticData] = []
+        usage: list[StatisticData] = []
+        for bucket in self.pending:
+            # Backfilled hours replace the empty ones imported during a gap;
+            # no usage was imported after them, so the sums stay monotonic.
+            if bucket.start <= self._last_imported and not bucket.backfill:
+                continue
+            start = datetime.fromtimestamp(bucket.start, timezone.utc)
+            self._sum += bucket.usage
+            if bucket.usage_today is not None:
+                usage.append(
+                    StatisticData(start=start, state=bucket.usage_today, sum=self._sum)
+                )
+            else:
+                usage.append(StatisticData(start=start, sum=self._sum))
+            if bucket.flow_mean is not None:
+                flow.append(
+                    StatisticData(
+                        start=start,
+                        mean=bucket.flow_mean,
+                        min=bucket.flow_min,
+                        max=bucket.flow_max,
+                    )
+                )
+            self._last_imported = max(self._last_imported, bucket.start)
+        self.pending.clear()
+        if usage:
+            async_add_external_statistics(
+                self.hass,
+                StatisticMetaData(
+                    has_mean=False,
+                    has_sum=True,
+                    name=f"{self._name} Water Usage",
+                    source=DOMAIN,
+                    statistic_id=self.usage_statistic_id,
+                    unit_of_measurement=UnitOfVolume.GALLONS,
+                ),
+                usage,
+            )
+        if flow:
+            async_add_external_statistics(
+                self.hass,
+                StatisticMetaData(
+                    has_mean=True,
+                    has_sum=False,
+                    name=f"{self._name} Water Flow",
+                    source=DOMAIN,
+                    statistic_id=self.flow_statistic_id,
+                    unit_of_measurement="GPM",
+                ),
+                flow,
+            )
@@ -9,10 +9,10 @@ from homeassistant.components.number import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .coordinator import WaterSoftenerDataUpdateCoordinator
+from .entity import WaterSoftenerEntity
 
 NUMBER_DESCRIPTION = NumberEntityDescription(
     key="brine_tank_level",
@@ -36,7 +36,7 @@ async def async_setup_entry(
     async_add_entities([WaterSoftenerSaltLevelNumber(coordinator, NUMBER_DESCRIPTION)])
 
 
-class WaterSoftenerSaltLevelNumber(CoordinatorEntity, NumberEntity):
+class WaterSoftenerSaltLevelNumber(WaterSoftenerEntity, NumberEntity):
     """A number entity to set the salt level on the Bluetooth Water Softener."""
 
     def __init__(
@@ -59,8 +59,7 @@ class WaterSoftenerSaltLevelNumber(CoordinatorEntity, NumberEntity):
 
     async def async_set_native_value(self, value: float) -> None:
         """Set the salt level."""
+        # Returns once the device has echoed the new value back, which also
+        # updates the state through the coordinator.
         await self.coordinator.set_salt_level(int(value))
-        # We optimistically update the state. The coordinator will get the
-        # real value from the device notification shortly.
-        self.async_write_ha_state()
 
@@ -1,98 +1,478 @@
 """Parser for the Bluetooth Water Softener BLE data."""
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
 import struct
+import time
 from typing import Any, Dict
 
+
+@dataclass(frozen=True)
+class PacketFamily:
+    """A packet family, identified by its two byte header."""
+
+    header: bytes
+    # Total frame length on the wire, including the trailing checksum byte.
+    frame_length: int
+    # Number of bytes after the header that select the layout within the family.
+    selector_length: int = 0
+
+
+@dataclass(frozen=True)
+class PacketLayout:
+    """Declarative layout of one packet type.
+
+    `fmt` is a big-endian struct format read at `offset`. Field names starting
+    with an underscore are decoded but not published. `scale` divides raw
+    values before they are published, and `derived` publishes formatted values
+    built from other fields, as (name, template, sources).
+    """
+
+    header: bytes
+    fmt: str
+    fields: tuple[str, ...]
+    offset: int
+    selector: bytes = b""
+    scale: dict[str, float] = field(default_factory=dict)
+    derived: tuple[tuple[str, str, tuple[str, ...]], ...] = ()
+    # Layout applies to firmware at or above this (major, minor) version.
+    min_firmware: tuple[int, int] = (0, 0)
+    # Fields holding the (major, minor) firmware version, if any.
+    firmware_fields: tuple[str, str] | None = None
+
+
+@dataclass(frozen=True)
+class CommandLayout:
+    """Declarative layout of a command written to the device."""
+
+    header: bytes
+    fmt: str
+    fields: tuple[str, ...]
+    defaults: dict[str, int] = field(default_factory=dict)
+
+
+# Frame lengths are taken from the captured sample frames below.
+PACKET_FAMILIES: tuple[PacketFamily, ...] = (
+    PacketFamily(b"tt", frame_length=18),
+    PacketFamily(b"uu", frame_length=20, selector_length=1),
+    PacketFamily(b"vv", frame_length=20, selector_length=2),
+    PacketFamily(b"ww", frame_length=19),
+)
+
+# Writable settings, as (page, setting_id). They are echoed back in 'vv'
+# packets as 0x76 0x76 <page> <setting_id> <value>.
+# Based on the log, the salt level is page 1, setting_id 10.
+SETTINGS: dict[str, tuple[int, int]] = {
+    "brine_tank_level": (0x01, 0x0A),
+}
+
+PACKET_LAYOUTS: tuple[PacketLayout, ...] = (
+    # (0x) 74-74-00-01-00-04-38-80-04-03-00-36-00-00-71-47-78-00
+    PacketLayout(
+        header=b"tt",
+        fmt=">BB",
+        fields=("_fw_major", "_fw_minor"),
+        offset=5,
+        derived=(("firmware_version", "C{}.{}", ("_fw_major", "_fw_minor")),),
+        firmware_fields=("_fw_major", "_fw_minor"),
+    ),
+    # Dashboard and advanced settings pages. Their field offsets are not
+    # confirmed yet (see UNCONFIRMED_LAYOUTS), so the frames are recognized
+    # but nothing is published from them.
+    # (0x) 75-75-00-01-1C-01-7C-00-07-0A-ED-00-5F-01-D9-08-02-00-00-39
+    PacketLayout(header=b"uu", selector=b"\x00", fmt="", fields=(), offset=3),
+    # (0x) 75-75-01-05-03-00-00-00-00-01-00-00-00-01-02-10-18-0A-00-3A
+    PacketLayout(header=b"uu", selector=b"\x01", fmt="", fields=(), offset=3),
+    # History data
+    # (0x) 77-77-00-00-05-02-91-DD-01-90-DD-01-19-01-19-00-00-00-43
+    PacketLayout(
+        header=b"ww",
+        fmt=">IIHH",
+        fields=(
+            "total_gallons_treated",
+            "total_gallons_treated_since_reset",
+            "total_regenerations",
+            "total_regenerations_since_last_reset",
+        ),
+        offset=6,
+    ),
+    # Settings data
+    # (0x) 76-76-01-0A-3C-0A-0A-00-00-00-00-00-00-00-00-00-00-00-00-43
+    *(
+        PacketLayout(
+            header=b"vv",
+            selector=bytes((page, setting_id)),
+            fmt=">B",
+            fields=(key,),
+            offset=4,
+        )
+        for key, (page, setting_id) in SETTINGS.items()
+    ),
+)
+
+# Guessed layouts of the 'uu' pages. Decoded against the sample frames above
+# they give implausible values (a current flow of 317.44 GPM), so they are
+# left out of PACKET_LAYOUTS until the offsets and scaling are confirmed
+# against captures. The simulator uses them, and they can be tried on a
+# capture with `capture.py --unconfirmed`.
+UNCONFIRMED_LAYOUTS: tuple[PacketLayout, ...] = (
+    # Main dashboard data
+    PacketLayout(
+        header=b"uu",
+        selector=b"\x00",
+        fmt=">HhHhBbb",
+        fields=(
+            "current_water_flow",
+            "soft_water_remaining",
+            "treated_water_usage_today",
+            "peak_flow_today",
+            "water_hardness",
+            "_regen_hr",
+            "_regen_min",
+        ),
+        offset=6,
+        scale={"current_water_flow": 100.0, "peak_flow_today": 100.0},
+        derived=(
+            ("regeneration_time", "{:02d}:{:02d}", ("_regen_hr", "_regen_min")),
+        ),
+    ),
+    # Advanced settings
+    PacketLayout(
+        header=b"uu",
+        selector=b"\x01",
+        fmt=">BBHHI",
+        fields=(
+            "days_until_regeneration",
+            "regeneration_day_override",
+            "reserve_capacity",
+            "resin_grains_capacity",
+            "brine_soak_duration",
+        ),
+        offset=4,
+    ),
+)
+
+# Keys PACKET_LAYOUTS publish; entities are only created for these.
+PUBLISHED_KEYS = frozenset(
+    key
+    for layout in PACKET_LAYOUTS
+    for key in (*layout.fields, *(name for name, _, _ in layout.derived))
+    if not key.startswith("_")
+)
+
+COMMAND_LAYOUTS: dict[str, CommandLayout] = {
+    "regenerate_now": CommandLayout(
+        header=b"rr", fmt=">B", fields=("mode",), defaults={"mode": 0x01}
+    ),
+    "write_setting": CommandLayout(
+        header=b"vv", fmt=">BBB", fields=("page", "setting_id", "value")
+    ),
+    # Requests for one packet family. The query opcodes have not been seen
+    # in a capture yet; until they are, these send the family header and
+    # selector, mirroring the layout of the frames they ask for. Only the
+    # read-only families have placeholders: a 'vv' query would be the prefix
+    # of a setting write and could be taken for a truncated one.
+    "query_tt": CommandLayout(header=b"tt", fmt="", fields=()),
+    "query_uu": CommandLayout(header=b"uu", fmt=">B", fields=("selector",)),
+    "query_ww": CommandLayout(header=b"ww", fmt="", fields=()),
+}
+
+
+_MISSING = object()
+
+
+class _Decoder:
+    """A packet layout compiled into a precompiled struct decoder."""
+
+    __slots__ = ("_struct", "_offset", "min_length", "_fields", "_derived", "firmware")
+
+    def __init__(self, layout: PacketLayout) -> None:
+        """Compile the layout."""
+        self._struct = struct.Struct(layout.fmt)
+        self._offset = layout.offset
+        self.min_length = layout.offset + self._struct.size
+        index = {name: i for i, name in enumerate(layout.fields)}
+        self._fields = tuple(
+            (i, name, layout.scale.get(name))
+            for i, name in enumerate(layout.fields)
+            if not name.startswith("_")
+        )
+        self._derived = tuple(
+            (name, template.format, tuple(index[source] for source in sources))
+            for name, template, sources in layout.derived
+        )
+        self.firmware = (
+            tuple(index[name] for name in layout.firmware_fields)
+            if layout.firmware_fields
+            else None
+        )
+
+    def decode(
+        self,
+        data,
+        out: Dict[str, Any],
+        changed: list[str],
+        received: Dict[str, float],
+        now: float,
+    ) -> tuple | None:
+        """Decode the buffer into `out`, returning the raw values.
+
+        Names of fields whose value differs from the one already in `out`, or
+        that are received for the first time, are appended to `changed`.
+        Every decoded field is stamped with `now` in `received`.
+        """
+        if len(data) < self.min_length:
+            return None
+        values = self._struct.unpack_from(data, self._offset)
+        for i, name, scale in self._fields:
+            value = values[i] if scale is None else values[i] / scale
+            if out.get(name, _MISSING) != value or name not in received:
+                out[name] = value
+                changed.append(name)
+            received[name] = now
+        for name, fmt, sources in self._derived:
+            value = fmt(*[values[i] for i in sources])
+            if out.get(name, _MISSING) != value or name not in received:
+                out[name] = value
+                changed.append(name)
+            received[name] = now
+        return values
+
+
+def _header_key(header: bytes) -> int:
+    return header[0] << 8 | header[1]
+
+
+def _selector_key(selector: bytes) -> int:
+    return int.from_bytes(selector, "big") if selector else 0
+
+
+class PacketCodec:
+    """Table-driven decoder for notification packets.
+
+    Layouts are compiled once per firmware version into a dict dispatch of
+    header -> selector -> decoder, so decoding a frame is two dict lookups and
+    one `unpack_from` on the original buffer.
+    """
+
+    def __init__(
+        self,
+        layouts: tuple[PacketLayout, ...] = PACKET_LAYOUTS,
+        families: tuple[PacketFamily, ...] = PACKET_FAMILIES,
+    ) -> None:
+        """Initialize the codec."""
+        self._layouts = layouts
+        self._selector_lengths = {
+            _header_key(family.header): family.selector_length for family in families
+        }
+        self._compiled: dict[tuple[int, int], dict[int, tuple[int, dict]]] = {}
+        self.dispatch = self.compile((0, 0))
+
+    def compile(self, firmware: tuple[int, int]) -> dict[int, tuple[int, dict]]:
+        """Return the dispatch table for a firmware version."""
+        if (dispatch := self._compiled.get(firmware)) is not None:
+            return dispatch
+
+        selected: dict[tuple[int, int], PacketLayout] = {}
+        for layout in self._layouts:
+            if layout.min_firmware > firmware:
+                continue
+            key = (_header_key(layout.header), _selector_key(layout.selector))
+            current = selected.get(key)
+            if current is None or layout.min_firmware >= current.min_firmware:
+                selected[key] = layout
+
+        dispatch = {}
+        for (header, selector), layout in selected.items():
+            selector_length = self._selector_lengths[header]
+            dispatch.setdefault(header, (selector_length, {}))[1][selector] = _Decoder(
+                layout
+            )
+        self._compiled[firmware] = dispatch
+        return dispatch
+
+    def decode(
+        self,
+        data,
+        out: Dict[str, Any],
+        changed: list[str],
+        received: Dict[str, float],
+        now: float,
+    ) -> bool:
+        """Decode one frame into `out`. Returns False if it was not recognized."""
+        if len(data) < 2:
+            return False
+        entry = self.dispatch.get(data[0] << 8 | data[1])
+        if entry is None:
+            return False
+        selector_length, decoders = entry
+        if selector_length == 0:
+            selector = 0
+        elif len(data) < 2 + selector_length:
+            return False
+        elif selector_length == 1:
+            selector = data[2]
+        else:
+            selector = data[2] << 8 | data[3]
+        decoder = decoders.get(selector)
+        if decoder is None:
+            return False
+        values = decoder.decode(data, out, changed, received, now)
+        if values is None:
+            return False
+        if decoder.firmware is not None:
+            major, minor = decoder.firmware
+            self.dispatch = self.compile((values[major], values[minor]))
+        return True
+
+
+class _Encoder:
+    """A command layout compiled into a precompiled struct encoder."""
+
+    __slots__ = ("_struct", "_header", "_fields", "_defaults")
+
+    def __init__(self, layout: CommandLayout) -> None:
+        """Compile the layout."""
+        self._struct = struct.Struct(layout.fmt)
+        self._header = layout.header
+        self._fields = layout.fields
+        self._defaults = layout.defaults
+
+    def encode(self, values: dict[str, int]) -> bytes:
+        """Encode the command."""
+        merged = {**self._defaults, **values}
+        return self._header + self._struct.pack(*(merged[name] for name in self._fields))
+
+    def decode(self, data) -> tuple | None:
+        """Decode a frame with the command's layout, e.g. a device echo."""
+        header = self._header
+        if (
+            len(data) < len(header) + self._struct.size
+            or data[0] != header[0]
+            or data[1] != header[1]
+        ):
+            return None
+        return self._struct.unpack_from(data, len(header))
+
+
+_ENCODERS = {name: _Encoder(layout) for name, layout in COMMAND_LAYOUTS.items()}
+
+
+def encode_command(name: str, **values: int) -> bytes:
+    """Encode a command from its layout in COMMAND_LAYOUTS."""
+    return _ENCODERS[name].encode(values)
+
+
+def encode_setting(key: str, value: int) -> bytes:
+    """Encode a write of a setting listed in SETTINGS."""
+    page, setting_id = SETTINGS[key]
+    return encode_command("write_setting", page=page, setting_id=setting_id, value=value)
+
+
+def decode_setting_echo(data) -> tuple[int, int, int] | None:
+    """Return (page, setting_id, value) if the frame echoes a setting."""
+    return _ENCODERS["write_setting"].decode(data)
+
+
+class DataSnapshot(Mapping[str, Any]):
+    """An immutable copy of the decoded data at one version.
+
+    Snapshots of the same parser compare equal exactly when their versions
+    do, which is O(1). `received` reads the parser's live receive times, so
+    freshness is always current even for an older snapshot.
+    """
+
+    __slots__ = ("version", "_values", "_received")
+
+    def __init__(
+        self, version: int, values: Dict[str, Any], received: Dict[str, float]
+    ) -> None:
+        """Initialize the snapshot."""
+        self.version = version
+        self._values = values
+        self._received = received
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, DataSnapshot):
+            return self.version == other.version and self._received is other._received
+        return NotImplemented
+
+    __hash__ = None
+
+    def received(self, key: str) -> float | None:
+        """Return the time.monotonic() a field was last received, if ever."""
+        return self._received.get(key)
+
+
 class WaterSoftenerBluetoothDeviceData:
     """Data parser for the water softener."""
 
-    def __init__(self):
+    def __init__(self, layouts: tuple[PacketLayout, ...] = PACKET_LAYOUTS):
         """Initialize the data parser."""
         self._data = {}
+        # time.monotonic() each field was last received from the device.
+        self._received: Dict[str, float] = {}
+        self._version = 0
+        self._snapshot = DataSnapshot(0, {}, self._received)
+        self._codec = PacketCodec(layouts)
+
+    def parse_data(self, data) -> Dict[str, Any]:
+        """Parse the raw BLE data.
 
-    def parse_data(self, data: bytes) -> Dict[str, Any]:
-        """Parse the raw BLE data."""
+        Accepts any buffer (bytes, bytearray or memoryview); fields are
+        unpacked in place without copying the frame.
+        """
         if len(data) < 2:
             return None
 
-        header = data[:2]
-
-        if header == b'tt':
-            self._parse_tt_packet(data)
-        elif header == b'uu':
-            self._parse_uu_packet(data)
-        elif header == b'vv':
-            self._parse_vv_packet(data)
-        elif header == b'ww':
-        	self._parse_ww_packet(data)
+        self.update(data)
 
         return self._data
 
+    def update(self, data) -> list[str] | None:
+        """Parse the raw BLE data and return the keys whose value changed.
+
+        Keys received for the first time count as changed. Returns None if
+        the frame was not recognized.
+        """
+        changed: list[str] = []
+        if not self._codec.decode(
+            data, self._data, changed, self._received, time.monotonic()
+        ):
+            return None
+        if changed:
+            self._version += 1
+        return changed
+
+    def restore(self, data: Mapping[str, Any]) -> None:
+        """Load values saved earlier; they count as never received."""
+        self._data.update(data)
+        self._version += 1
+
+    def snapshot(self) -> DataSnapshot:
+        """Return a snapshot of the data, copying it only if it changed."""
+        if self._snapshot.version != self._version:
+            self._snapshot = DataSnapshot(
+                self._version, dict(self._data), self._received
+            )
+        return self._snapshot
+
     @property
     def data(self) -> Dict[str, Any]:
-        """Return the parsed data."""
+        """Return the parsed data, updated in place."""
         return self._data
 
-    def _parse_tt_packet(self, data: bytes):
-        """Parse the 'tt' packet for firmware version."""
-        # (0x) 74-74-00-01-00-04-38-80-04-03-00-36-00-00-71-47-78-00
-        if len(data) >= 7:
-            major = data[5]
-            minor = data[6]
-            self._data["firmware_version"] = f"C{major}.{minor}"
-
-    def _parse_uu_packet(self, data: bytes):
-        """Parse the 'uu' packet for sensor data."""
-        # (0x) 75-75-00-01-1C-01-7C-00-07-0A-ED-00-5F-01-D9-08-02-00-00-39
-        # (0x) 75-75-01-05-03-00-00-00-00-01-00-00-00-01-02-10-18-0A-00-3A
-        if len(data) < 20:
-            return
-
-        packet_type = data[2]
-
-        if packet_type == 0: # Main dashboard data
-            try:
-                flow, remaining, today_usage, peak_flow, hardness, regen_hr, regen_min = struct.unpack(
-                    '>xxxxHhHhBbbxx', data[2:20]
-                )
-                self._data["current_water_flow"] = flow / 100.0
-                self._data["soft_water_remaining"] = remaining
-                self._data["treated_water_usage_today"] = today_usage
-                self._data["peak_flow_today"] = peak_flow / 100.0
-                self._data["water_hardness"] = hardness
-                self._data["regeneration_time"] = f"{regen_hr:02d}:{regen_min:02d}"
-            except struct.error:
-                pass # Ignore malformed packets
-        
-        elif packet_type == 1: # Advanced settings
-        	try:
-        		days_until_regen, regen_override, reserve, resin_grains, soak_hr = struct.unpack(
-        			'>xxBBHHIx', data[2:14] # Simplified, needs verification
-        		)
-        		self._data["days_until_regeneration"] = days_until_regen
-        		self._data["regeneration_day_override"] = regen_override
-        		self._data["reserve_capacity"] = reserve
-        		self._data["resin_grains_capacity"] = resin_grains
-        		self._data["brine_soak_duration"] = soak_hr
-        	except struct.error:
-        		pass
-
-    def _parse_vv_packet(self, data: bytes):
-        """Parse the 'vv' packet for settings data."""
-        # (0x) 76-76-01-0A-3C-0A-0A-00-00-00-00-00-00-00-00-00-00-00-00-43
-        if len(data) >= 5 and data[2:4] == b'\x01\x0A':
-            self._data["brine_tank_level"] = data[4]
-
-    def _parse_ww_packet(self, data: bytes):
-        """Parse the 'ww' packet for history data."""
-        # (0x) 77-77-00-00-05-02-91-DD-01-90-DD-01-19-01-19-00-00-00-43
-        if len(data) >= 16:
-            try:
-                total_gallons, total_gallons_reset, total_regens, total_regens_reset = struct.unpack(
-                    '>xxxxIIHH', data[2:18]
-                )
-                self._data["total_gallons_treated"] = total_gallons
-                self._data["total_gallons_treated_since_reset"] = total_gallons_reset
-                self._data["total_regenerations"] = total_regens
-                self._data["total_regenerations_since_last_reset"] = total_regens_reset
-            except struct.error:
-                pass
+    @property
+    def received(self) -> Dict[str, float]:
+        """Return the time.monotonic() each field was last received."""
+        return self._received
@@ -0,0 +1,107 @@
+"""Connection path selection across Bluetooth adapters and proxies.
+
+Every connectable scanner that recently heard the softener is a possible
+path. Paths are tried in order: the one that connected last, unless it
+failed repeatedly since, then the others by signal strength. Scanners
+without a free connection slot go last.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import time
+
+from bleak.backends.device import BLEDevice
+
+from homeassistant.components.bluetooth import (
+    async_current_allocations,
+    async_scanner_devices_by_address,
+)
+from homeassistant.core import HomeAssistant
+
+# Failed connects after which a path is passed over for the next best one.
+MAX_PATH_FAILURES = 2
+# Seconds after which a path's failures are forgotten.
+PATH_FAILURE_RESET = 600.0
+
+
+@dataclass(slots=True)
+class ConnectionPath:
+    """A scanner the device can be connected through."""
+
+    source: str
+    name: str
+    rssi: int
+    # None if the scanner does not report its connection slots.
+    free_slots: int | None
+    ble_device: BLEDevice
+
+
+class PathSelector:
+    """Rank the paths to one device and remember how they fared."""
+
+    def __init__(self, hass: HomeAssistant, address: str) -> None:
+        """Initialize the selector."""
+        self.hass = hass
+        self.address = address
+        self.last_good: str | None = None
+        # Consecutive failures and monotonic time of the last, per source.
+        self._failures: dict[str, tuple[int, float]] = {}
+
+    def ranked(self) -> list[ConnectionPath]:
+        """Return the current paths, best first."""
+        allocations = {
+            allocation.source: allocation
+            for allocation in async_current_allocations(self.hass) or ()
+        }
+        paths = []
+        for device in async_scanner_devices_by_address(
+            self.hass, self.address, connectable=True
+        ):
+            source = device.scanner.source
+            allocation = allocations.get(source)
+            paths.append(
+                ConnectionPath(
+                    source=source,
+                    name=device.scanner.name,
+                    rssi=device.advertisement.rssi,
+                    free_slots=allocation.free if allocation is not None else None,
+                    ble_device=device.ble_device,
+                )
+            )
+        return sorted(
+            paths,
+            key=lambda path: (
+                path.free_slots == 0,
+                self.failing(path.source),
+                path.source != self.last_good,
+                -path.rssi,
+                -(path.free_slots or 0),
+            ),
+        )
+
+    def failing(self, source: str) -> bool:
+        """Return True if a path failed repeatedly and recently."""
+        count, last = self._failures.get(source, (0, 0.0))
+        if count and time.monotonic() - last > PATH_FAILURE_RESET:
+            del self._failures[source]
+            return False
+        return count >= MAX_PATH_FAILURES
+
+    def record_failure(self, source: str) -> None:
+        """Count a failed connect through a path."""
+        count, _ = self._failures.get(source, (0, 0.0))
+        self._failures[source] = (count + 1, time.monotonic())
+
+    def record_success(self, source: str) -> None:
+        """Prefer a path that connected for the next connect."""
+        self._failures.pop(source, None)
+        self.last_good = source
+
+    def as_dict(self) -> dict[str, object]:
+        """Return the path state for diagnostics."""
+        return {
+            "last_good": self.last_good,
+            "failures": {
+                source: count for source, (count, _) in self._failures.items()
+            },
+        }
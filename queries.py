@@ -0,0 +1,204 @@
+"""Per-packet-family request scheduling.
+
+Instead of relying on whatever the device pushes, each packet family is
+requested on its own interval while connected: 'tt' once per connection,
+'uu' dashboard data quickly while water flows and slowly otherwise, the
+'uu' settings page every half hour and the 'ww' totals hourly. A family is
+only requested once its last frame, pushed or requested, is older than its
+interval. 'vv' settings are never requested: no query for them has been
+confirmed, and the obvious guess is indistinguishable from the start of a
+setting write.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .commands import Command
+from .parser import PACKET_FAMILIES, encode_command
+from .scheduler import PRIORITY_REFRESH
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds to let the device push its greeting frames after connecting
+# before anything is requested.
+QUERY_SETTLE = 2.0
+# Shortest time between two checks of the schedule.
+MIN_CHECK_INTERVAL = 0.5
+
+_SELECTOR_LENGTHS = {
+    family.header[0]: family.selector_length for family in PACKET_FAMILIES
+}
+
+
+def _key(header: bytes, selector: bytes = b"") -> int:
+    return header[0] << 16 | int.from_bytes(selector, "big")
+
+
+def frame_key(frame) -> int:
+    """Return the freshness key of a frame: its family and selector."""
+    selector_length = _SELECTOR_LENGTHS.get(frame[0], 0)
+    if selector_length == 0:
+        return frame[0] << 16
+    if selector_length == 1:
+        return frame[0] << 16 | frame[2]
+    return frame[0] << 16 | frame[2] << 8 | frame[3]
+
+
+@dataclass(frozen=True)
+class FamilyPolicy:
+    """When to request one packet family."""
+
+    command: str
+    header: bytes
+    selector: bytes = b""
+    values: dict[str, int] = field(default_factory=dict)
+    # Seconds a frame stays fresh; None requests it once per connection.
+    interval: float | None = None
+    # Interval used while water is flowing.
+    flowing_interval: float | None = None
+
+    @property
+    def key(self) -> int:
+        """Return the freshness key of the frames this policy requests."""
+        return _key(self.header, self.selector)
+
+
+POLICIES: tuple[FamilyPolicy, ...] = (
+    FamilyPolicy("query_tt", b"tt"),
+    FamilyPolicy(
+        "query_uu",
+        b"uu",
+        b"\x00",
+        {"selector": 0},
+        interval=300.0,
+        flowing_interval=2.0,
+    ),
+    FamilyPolicy("query_uu", b"uu", b"\x01", {"selector": 1}, interval=1800.0),
+    FamilyPolicy("query_ww", b"ww", interval=3600.0),
+)
+
+
+class FamilyRequestScheduler:
+    """Request stale packet families while the device is connected."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        submit: Callable[[Command], Coroutine[Any, Any, None]],
+        is_connected: Callable[[], bool],
+        policies: tuple[FamilyPolicy, ...] = POLICIES,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self._submit = submit
+        self._is_connected = is_connected
+        self.flowing = False
+        self._policies = policies
+        self._payloads = {
+            policy.key: encode_command(policy.command, **policy.values)
+            for policy in policies
+        }
+        # Loop time of the last frame seen and the last request, per key.
+        self._seen: dict[int, float] = {}
+        self._requested: dict[int, float] = {}
+        self._connected_at = 0.0
+        self._handle: asyncio.TimerHandle | None = None
+        self.requests_sent = 0
+
+    @callback
+    def async_start(self) -> None:
+        """Start requesting after a new connection."""
+        now = self.hass.loop.time()
+        self._connected_at = now
+        self._requested.clear()
+        self._schedule(now + QUERY_SETTLE)
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop requesting."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def seen(self, frame) -> None:
+        """Record a frame of any family, pushed or requested."""
+        self._seen[frame_key(frame)] = self.hass.loop.time()
+
+    @callback
+    def async_invalidate(self, header: bytes) -> None:
+        """Treat every frame of a family as stale, e.g. after a write."""
+        for policy in self._policies:
+            if policy.header == header:
+                self._seen.pop(policy.key, None)
+                self._requested.pop(policy.key, None)
+        if self._handle is not None:
+            self._schedule(self.hass.loop.time())
+
+    @callback
+    def async_set_flowing(self, flowing: bool) -> None:
+        """Switch the dashboard data between its fast and slow interval."""
+        if flowing == self.flowing:
+            return
+        self.flowing = flowing
+        if self._handle is not None:
+            self._schedule(self.hass.loop.time())
+
+    def _due(self, policy: FamilyPolicy, flowing: bool) -> float:
+        """Return the loop time at which a family needs requesting."""
+        key = policy.key
+        last = max(self._seen.get(key, 0.0), self._requested.get(key, 0.0))
+        if policy.interval is None:
+            # Once per connection.
+            return float("inf") if last >= self._connected_at else 0.0
+        interval = policy.interval
+        if flowing and policy.flowing_interval is not None:
+            interval = policy.flowing_interval
+        return last + interval
+
+    def _schedule(self, when: float) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self.hass.loop.call_at(when, self._async_check)
+
+    @callback
+    def _async_check(self) -> None:
+        """Request every family that is due and wait for the next one."""
+        self._handle = None
+        if not self._is_connected():
+            return
+        now = self.hass.loop.time()
+        flowing = self.flowing
+        next_due = float("inf")
+        for policy in self._policies:
+            due = self._due(policy, flowing)
+            if due <= now:
+                self._requested[policy.key] = now
+                self.requests_sent += 1
+                self.hass.async_create_task(self._async_request(policy))
+                due = self._due(policy, flowing)
+            next_due = min(next_due, due)
+        if next_due != float("inf"):
+            self._schedule(max(next_due, now + MIN_CHECK_INTERVAL))
+
+    async def _async_request(self, policy: FamilyPolicy) -> None:
+        """Send a query, replacing an older one still queued for the family."""
+        try:
+            await self._submit(
+                Command(
+                    f"Request {policy.header.decode()}",
+                    self._payloads[policy.key],
+                    key=("query", policy.key),
+                    retries=0,
+                    # Routine reads must not preempt other devices' slots.
+                    priority=PRIORITY_REFRESH,
+                )
+            )
+        except HomeAssistantError as err:
+            _LOGGER.debug("%s", err)
@@ -0,0 +1,209 @@
+"""Connection slot scheduling shared by all water softeners."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_SLOT_SCHEDULER, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_COMMAND = 0
+PRIORITY_REFRESH = 1
+
+# Seconds a holder keeps its slot before it can be asked to release it.
+# A waiting command preempts holders that connected for a refresh at once.
+REFRESH_TIME_SLICE = 120.0
+COMMAND_TIME_SLICE = 30.0
+
+
+@dataclass
+class SlotWaitStats:
+    """Time a device spent waiting for a connection slot."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float = 0.0
+
+    def record(self, wait: float) -> None:
+        """Record one wait."""
+        self.count += 1
+        self.total += wait
+        self.last = wait
+        if wait > self.max:
+            self.max = wait
+
+
+@dataclass
+class _Holder:
+    priority: int
+    granted: float
+    preempting: bool = False
+
+
+@dataclass(order=True)
+class _Waiter:
+    sort_key: tuple
+    address: str = field(compare=False)
+    priority: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class ConnectionSlotScheduler:
+    """Hand out a limited number of connection slots across devices.
+
+    Waiters are served by priority (commands before refreshes), then by how
+    far past their staleness deadline they are, then by who was served
+    least recently. When every slot is taken, the longest holder whose time
+    slice has run out is asked to release its slot.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self._limits: dict[str, int] = {}
+        self._preempt: dict[str, Callable[[], None]] = {}
+        self._holders: dict[str, _Holder] = {}
+        self._waiters: list[_Waiter] = []
+        self._last_served: dict[str, float] = {}
+        self._recheck: asyncio.TimerHandle | None = None
+        self.wait_stats: dict[str, SlotWaitStats] = {}
+
+    @property
+    def slots(self) -> int:
+        """Return the number of slots, the smallest any device configured."""
+        return min(self._limits.values(), default=1)
+
+    @property
+    def in_use(self) -> int:
+        """Return the number of slots currently held."""
+        return len(self._holders)
+
+    @callback
+    def async_register(
+        self, address: str, slots: int, preempt: Callable[[], None]
+    ) -> None:
+        """Register a device and the callback that makes it release its slot."""
+        self._limits[address] = slots
+        self._preempt[address] = preempt
+        self.wait_stats.setdefault(address, SlotWaitStats())
+        self._async_dispatch()
+
+    @callback
+    def async_unregister(self, address: str) -> None:
+        """Forget a device."""
+        self._limits.pop(address, None)
+        self._preempt.pop(address, None)
+        self.wait_stats.pop(address, None)
+        self._last_served.pop(address, None)
+        self.async_release(address)
+
+    async def async_acquire(self, address: str, priority: int, deadline: float) -> None:
+        """Wait for a slot.
+
+        `deadline` is the loop time at which the device's data exceeds its
+        staleness budget.
+        """
+        if (holder := self._holders.get(address)) is not None:
+            holder.priority = min(holder.priority, priority)
+            return
+
+        loop = self.hass.loop
+        started = loop.time()
+        if not self._waiters and len(self._holders) < self.slots:
+            self._grant(address, priority)
+            self.wait_stats[address].record(0.0)
+            return
+
+        waiter = _Waiter(
+            (priority, deadline, self._last_served.get(address, 0.0)),
+            address,
+            priority,
+            loop.create_future(),
+        )
+        self._waiters.append(waiter)
+        self._async_dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Granted just before the cancellation arrived.
+                self.async_release(address)
+            raise
+        wait = loop.time() - started
+        self.wait_stats[address].record(wait)
+        _LOGGER.debug("%s waited %.1fs for a connection slot", address, wait)
+
+    @callback
+    def async_release(self, address: str) -> None:
+        """Release the slot held by a device, if any."""
+        if self._holders.pop(address, None) is not None:
+            self._async_dispatch()
+
+    def _grant(self, address: str, priority: int) -> None:
+        now = self.hass.loop.time()
+        self._holders[address] = _Holder(priority, now)
+        self._last_served[address] = now
+
+    @callback
+    def _async_dispatch(self) -> None:
+        """Grant free slots to the best waiters, preempting if needed."""
+        if self._recheck is not None:
+            self._recheck.cancel()
+            self._recheck = None
+        while self._waiters and len(self._holders) < self.slots:
+            self._waiters.sort()
+            waiter = self._waiters.pop(0)
+            if waiter.future.done():
+                continue
+            self._grant(waiter.address, waiter.priority)
+            waiter.future.set_result(None)
+        if self._waiters:
+            self._async_preempt(min(self._waiters))
+
+    def _async_preempt(self, waiter: _Waiter) -> None:
+        """Ask the longest eligible holder to give up its slot."""
+        now = self.hass.loop.time()
+        candidate: str | None = None
+        next_check: float | None = None
+        for address, holder in self._holders.items():
+            if holder.preempting:
+                return
+            if waiter.priority == PRIORITY_COMMAND and holder.priority != PRIORITY_COMMAND:
+                expires = holder.granted
+            elif holder.priority == PRIORITY_COMMAND:
+                expires = holder.granted + COMMAND_TIME_SLICE
+            else:
+                expires = holder.granted + REFRESH_TIME_SLICE
+            if expires > now:
+                next_check = expires if next_check is None else min(next_check, expires)
+                continue
+            if candidate is None or holder.granted < self._holders[candidate].granted:
+                candidate = address
+
+        if candidate is not None and candidate in self._preempt:
+            _LOGGER.debug(
+                "Asking %s to release its connection slot for %s",
+                candidate,
+                waiter.address,
+            )
+            self._holders[candidate].preempting = True
+            self._preempt[candidate]()
+        elif next_check is not None:
+            self._recheck = self.hass.loop.call_at(next_check, self._async_dispatch)
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> ConnectionSlotScheduler:
+    """Return the scheduler shared by all config entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (scheduler := domain_data.get(DATA_SLOT_SCHEDULER)) is None:
+        scheduler = domain_data[DATA_SLOT_SCHEDULER] = ConnectionSlotScheduler(hass)
+    return scheduler
@@ -1,6 +1,11 @@
 """Sensor platform for Bluetooth Water Softener."""
 from __future__ import annotations
 
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
@@ -8,13 +13,26 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfVolume
+from homeassistant.const import EntityCategory, UnitOfTime, UnitOfVolume
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
-from .coordinator import WaterSoftenerDataUpdateCoordinator
+from .coordinator import DUTY_CYCLE_KEY, WaterSoftenerDataUpdateCoordinator
+from .duty_cycle import STATES as DUTY_CYCLE_STATES
+from .entity import WaterSoftenerEntity
+from .forecast import (
+    CAPACITY_EXHAUSTED,
+    NEXT_REGENERATION,
+    PREDICTION_INPUTS,
+    SALT_REFILL_DATE,
+)
+from .parser import PUBLISHED_KEYS
+
+# Diagnostic sensors are polled so hot-path counters never trigger writes.
+SCAN_INTERVAL = timedelta(minutes=1)
 
 SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
     SensorEntityDescription(
@@ -87,6 +105,162 @@ SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
 )
 
 
+FORECAST_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(
+        key=CAPACITY_EXHAUSTED,
+        name="Soft Water Capacity Exhausted",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        icon="mdi:water-alert",
+    ),
+    SensorEntityDescription(
+        key=NEXT_REGENERATION,
+        name="Next Regeneration",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        icon="mdi:autorenew",
+    ),
+    SensorEntityDescription(
+        key=SALT_REFILL_DATE,
+        name="Salt Refill Date",
+        device_class=SensorDeviceClass.DATE,
+        icon="mdi:shaker-outline",
+    ),
+)
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class WaterSoftenerDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor reporting the integration's own statistics."""
+
+    value_fn: Callable[[WaterSoftenerDataUpdateCoordinator], StateType]
+    attributes_fn: Callable[
+        [WaterSoftenerDataUpdateCoordinator], dict[str, Any]
+    ] | None = None
+    entity_category: EntityCategory = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+
+
+DIAGNOSTIC_SENSOR_DESCRIPTIONS: tuple[
+    WaterSoftenerDiagnosticSensorEntityDescription, ...
+] = (
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="frames_received",
+        name="Frames Received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:counter",
+        value_fn=lambda coordinator: coordinator.stats.total_frames,
+        attributes_fn=lambda coordinator: coordinator.stats.frames_by_type(),
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="parse_failures",
+        name="Unrecognized Frames",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:alert-circle-outline",
+        value_fn=lambda coordinator: coordinator.stats.parse_failures,
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="corrupt_frames",
+        name="Dropped Frames",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:alert-circle-outline",
+        value_fn=lambda coordinator: coordinator.framer.corrupt_frames,
+        attributes_fn=lambda coordinator: {
+            "discarded_bytes": coordinator.framer.discarded_bytes
+        },
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="parse_time",
+        name="Parse Time",
+        native_unit_of_measurement="µs",
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:timer-outline",
+        value_fn=lambda coordinator: (
+            None
+            if (mean := coordinator.stats.parse_time.mean) is None
+            else round(mean * 1e6, 1)
+        ),
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="state_latency",
+        name="Notification to State Latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:timer-outline",
+        value_fn=lambda coordinator: _milliseconds(
+            coordinator.stats.state_latency.percentile(0.95)
+        ),
+        attributes_fn=lambda coordinator: {
+            "mean": _milliseconds(coordinator.stats.state_latency.mean),
+            "max": _milliseconds(coordinator.stats.state_latency.max),
+        },
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="reconnects",
+        name="Reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:bluetooth-connect",
+        value_fn=lambda coordinator: max(0, coordinator.connection.connect_count - 1),
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="connect_duration",
+        name="Connect Duration",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        value_fn=lambda coordinator: coordinator.connection.last_connect_duration,
+        attributes_fn=lambda coordinator: {
+            "mean": coordinator.connection.connect_durations.mean,
+            "max": coordinator.connection.connect_durations.max,
+        },
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="command_round_trip",
+        name="Command Round Trip",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: _milliseconds(coordinator.commands.last_round_trip),
+        attributes_fn=lambda coordinator: {
+            "mean": _milliseconds(coordinator.commands.round_trips.mean),
+            "failures": coordinator.commands.failures,
+        },
+    ),
+    WaterSoftenerDiagnosticSensorEntityDescription(
+        key="slot_wait",
+        name="Connection Slot Wait",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda coordinator: (
+            stats.last
+            if (stats := coordinator.scheduler.wait_stats.get(coordinator.address))
+            else None
+        ),
+    ),
+)
+
+# Only created in adaptive connection mode; pushed on every state change.
+DUTY_CYCLE_SENSOR_DESCRIPTION = WaterSoftenerDiagnosticSensorEntityDescription(
+    key=DUTY_CYCLE_KEY,
+    name="Connection Policy",
+    device_class=SensorDeviceClass.ENUM,
+    options=list(DUTY_CYCLE_STATES),
+    entity_registry_enabled_default=True,
+    value_fn=lambda coordinator: coordinator.duty_cycle.state,
+    attributes_fn=lambda coordinator: {
+        "flowing": coordinator.duty_cycle.flowing,
+        "idle_backoff": coordinator.duty_cycle.idle_interval,
+        "releases": coordinator.duty_cycle.releases,
+    },
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -95,12 +269,30 @@ async def async_setup_entry(
     """Set up the sensor platform."""
     coordinator: WaterSoftenerDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
     async_add_entities(
-        WaterSoftenerSensor(coordinator, description)
-        for description in SENSOR_DESCRIPTIONS
+        [
+            *(
+                WaterSoftenerSensor(coordinator, description)
+                for description in SENSOR_DESCRIPTIONS
+                if description.key in PUBLISHED_KEYS
+            ),
+            *(
+                WaterSoftenerForecastSensor(coordinator, description)
+                for description in FORECAST_SENSOR_DESCRIPTIONS
+                if PREDICTION_INPUTS[description.key] <= PUBLISHED_KEYS
+            ),
+            *(
+                WaterSoftenerDiagnosticSensor(coordinator, description)
+                for description in DIAGNOSTIC_SENSOR_DESCRIPTIONS
+            ),
+        ]
     )
+    if coordinator.duty_cycle is not None:
+        async_add_entities(
+            [WaterSoftenerDiagnosticSensor(coordinator, DUTY_CYCLE_SENSOR_DESCRIPTION)]
+        )
 
 
-class WaterSoftenerSensor(CoordinatorEntity, SensorEntity):
+class WaterSoftenerSensor(WaterSoftenerEntity, SensorEntity):
     """A sensor for the Bluetooth Water Softener."""
 
     def __init__(
@@ -122,3 +314,65 @@ class WaterSoftenerSensor(CoordinatorEntity, SensorEntity):
     def native_value(self):
         """Return the state of the sensor."""
         return self.coordinator.data.get(self.entity_description.key)
+
+
+class WaterSoftenerForecastSensor(WaterSoftenerSensor):
+    """A sensor predicting when capacity or salt runs out."""
+
+    @property
+    def native_value(self):
+        """Return the prediction."""
+        return self.coordinator.forecast.predictions.get(self.entity_description.key)
+
+
+class WaterSoftenerDiagnosticSensor(
+    CoordinatorEntity[WaterSoftenerDataUpdateCoordinator], SensorEntity
+):
+    """A sensor exposing the integration's connection and parsing statistics."""
+
+    entity_description: WaterSoftenerDiagnosticSensorEntityDescription
+    _attr_should_poll = True
+
+    def __init__(
+        self,
+        coordinator: WaterSoftenerDataUpdateCoordinator,
+        description: WaterSoftenerDiagnosticSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{coordinator.address}_{description.key}"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, coordinator.address)},
+            "name": "Water Softener",
+            "manufacturer": "Unknown (from Bluetooth data)",
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Also write the state when the coordinator announces a change."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_key_listener(
+                self.entity_description.key, self.async_write_ha_state
+            )
+        )
+
+    @property
+    def available(self) -> bool:
+        """Statistics stay available while the device is unreachable."""
+        return True
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the state of the sensor."""
+        return self.entity_description.value_fn(self.coordinator)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the breakdown of the statistic."""
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self.coordinator)
+
+    async def async_update(self) -> None:
+        """Read the counters on the next state write; never refresh the device."""
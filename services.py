@@ -0,0 +1,179 @@
+"""Services for the Bluetooth Water Softener integration."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .coordinator import WaterSoftenerDataUpdateCoordinator
+from .flow_series import RESOLUTION_RAW, RESOLUTIONS
+from .parser import SETTINGS
+
+SERVICE_GET_FLOW_HISTORY = "get_flow_history"
+SERVICE_APPLY_SETTINGS = "apply_settings"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_RESOLUTION = "resolution"
+ATTR_SETTINGS = "settings"
+ATTR_KEY = "key"
+ATTR_PAGE = "page"
+ATTR_SETTING_ID = "setting_id"
+ATTR_VALUE = "value"
+
+_BYTE = vol.All(vol.Coerce(int), vol.Range(min=0, max=255))
+
+GET_FLOW_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_RESOLUTION, default="1s"): vol.In(RESOLUTIONS),
+    }
+)
+
+
+def _setting_location(setting: dict[str, Any]) -> tuple[int, int, int]:
+    """Resolve a named or addressed setting to (page, setting_id, value)."""
+    if ATTR_KEY in setting:
+        if ATTR_PAGE in setting or ATTR_SETTING_ID in setting:
+            raise vol.Invalid("Give either a setting key or its page and setting_id")
+        page, setting_id = SETTINGS[setting[ATTR_KEY]]
+    elif ATTR_PAGE in setting and ATTR_SETTING_ID in setting:
+        page, setting_id = setting[ATTR_PAGE], setting[ATTR_SETTING_ID]
+    else:
+        raise vol.Invalid("A setting needs a key or a page and setting_id")
+    return page, setting_id, setting[ATTR_VALUE]
+
+
+def _unique_settings(
+    writes: list[tuple[int, int, int]]
+) -> list[tuple[int, int, int]]:
+    """Reject a batch that writes the same setting twice."""
+    locations = [(page, setting_id) for page, setting_id, _ in writes]
+    if len(set(locations)) != len(locations):
+        raise vol.Invalid("Each setting may only be written once per batch")
+    return writes
+
+
+APPLY_SETTINGS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_SETTINGS): vol.All(
+            cv.ensure_list,
+            vol.Length(min=1),
+            [
+                vol.All(
+                    vol.Schema(
+                        {
+                            vol.Optional(ATTR_KEY): vol.In(list(SETTINGS)),
+                            vol.Optional(ATTR_PAGE): _BYTE,
+                            vol.Optional(ATTR_SETTING_ID): _BYTE,
+                            vol.Required(ATTR_VALUE): _BYTE,
+                        }
+                    ),
+                    _setting_location,
+                )
+            ],
+            _unique_settings,
+        ),
+    }
+)
+
+
+def _get_coordinator(
+    hass: HomeAssistant, call: ServiceCall
+) -> WaterSoftenerDataUpdateCoordinator:
+    """Return the coordinator of the config entry a service call targets."""
+    entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+    coordinator = hass.data.get(DOMAIN, {}).get(entry_id)
+    if not isinstance(coordinator, WaterSoftenerDataUpdateCoordinator):
+        raise ServiceValidationError(f"Water softener {entry_id} is not loaded")
+    return coordinator
+
+
+def _timestamp(value: datetime) -> float:
+    """Return the unix time of a datetime; naive ones are in local time."""
+    return dt_util.as_utc(value).timestamp()
+
+
+async def _async_get_flow_history(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Return the flow samples or downsampled buckets of a time window."""
+    coordinator = _get_coordinator(hass, call)
+    start = _timestamp(call.data[ATTR_START])
+    end = (
+        _timestamp(call.data[ATTR_END])
+        if ATTR_END in call.data
+        else dt_util.utcnow().timestamp() + 1
+    )
+    if start >= end:
+        raise ServiceValidationError("The start of the window must be before its end")
+    resolution = call.data[ATTR_RESOLUTION]
+    rows: list[Any] = [
+        list(row) for row in coordinator.flow_series.window(start, end, resolution)
+    ]
+    return {
+        "resolution": resolution,
+        "columns": (
+            ["time", "flow"]
+            if resolution == RESOLUTION_RAW
+            else ["start", "min", "max", "mean"]
+        ),
+        "rows": rows,
+    }
+
+
+async def _async_apply_settings(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Write a batch of settings and report the outcome of each."""
+    coordinator = _get_coordinator(hass, call)
+    results = await coordinator.async_apply_settings(call.data[ATTR_SETTINGS])
+    failed = [result for result in results if result["status"] == "failed"]
+    if failed and not call.return_response:
+        raise HomeAssistantError(
+            f"Setting page {failed[0][ATTR_PAGE]} setting "
+            f"{failed[0][ATTR_SETTING_ID]} failed: {failed[0]['error']}"
+        )
+    return {"success": not failed, "results": results}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services."""
+
+    async def get_flow_history(call: ServiceCall) -> ServiceResponse:
+        return await _async_get_flow_history(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_FLOW_HISTORY,
+        get_flow_history,
+        schema=GET_FLOW_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def apply_settings(call: ServiceCall) -> ServiceResponse:
+        return await _async_apply_settings(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_SETTINGS,
+        apply_settings,
+        schema=APPLY_SETTINGS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
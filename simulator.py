@@ -0,0 +1,283 @@
+"""Simulated CS_Meter_Soft device for development and benchmarking.
+
+`SimulatedSoftener` models the device state and streams tt/uu/vv/ww frames
+built from the packet layouts in parser.py. `SimulatedBleakClient` exposes
+it through the subset of the BleakClient API the integration uses, and can
+fragment or merge frames across notifications, corrupt frames and drop the
+link.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+import random
+import struct
+import time
+
+from .const import CHECKSUM_NONE, UART_RX_CHAR_UUID, UART_TX_CHAR_UUID
+from .framer import CHECKSUMS
+from .parser import (
+    COMMAND_LAYOUTS,
+    PACKET_FAMILIES,
+    PACKET_LAYOUTS,
+    SETTINGS,
+    UNCONFIRMED_LAYOUTS,
+    PacketLayout,
+    decode_setting_echo,
+)
+
+_FRAME_LENGTHS = {family.header: family.frame_length for family in PACKET_FAMILIES}
+# The simulated device fills in the guessed fields of the 'uu' pages too.
+_LAYOUTS = {
+    (layout.header, layout.selector): layout
+    for layout in PACKET_LAYOUTS + UNCONFIRMED_LAYOUTS
+}
+_QUERY_HEADERS = frozenset(
+    layout.header
+    for name, layout in COMMAND_LAYOUTS.items()
+    if name.startswith("query_")
+)
+
+
+@dataclass
+class SimulationProfile:
+    """Rates and fault injection for a simulated device."""
+
+    # Dashboard ('uu' type 0) frames per second while water is flowing.
+    dashboard_rate: float = 10.0
+    # Seconds between the slow 'uu' type 1, 'vv' and 'ww' frames.
+    slow_interval: float = 5.0
+    # Largest notification payload; frames are split to fit.
+    mtu_payload: int = 20
+    # Probability that a frame is split at a random point.
+    fragment_probability: float = 0.0
+    # Probability that a frame is sent together with the next one.
+    merge_probability: float = 0.0
+    # Probability that a byte of a frame is flipped after the checksum.
+    corrupt_probability: float = 0.0
+    # Probability per second that the link drops.
+    drop_probability: float = 0.0
+    checksum: str = CHECKSUM_NONE
+
+
+class SimulatedSoftener:
+    """State of a simulated water softener."""
+
+    def __init__(self, seed: int | None = None) -> None:
+        """Initialize the device state."""
+        self.random = random.Random(seed)
+        self.firmware = (4, 56)
+        self.flow = 0.0
+        self.soft_water_remaining = 1800
+        self.capacity = 1800
+        self.usage_today = 0
+        self.peak_flow = 0.0
+        self.hardness = 15
+        self.regeneration_time = (2, 0)
+        self.days_until_regeneration = 7
+        self.total_gallons = 250000
+        self.total_regenerations = 400
+        self.settings: dict[tuple[int, int], int] = {
+            SETTINGS["brine_tank_level"]: 60,
+        }
+        self.regenerations_requested = 0
+
+    def tick(self, elapsed: float) -> None:
+        """Advance the water usage model."""
+        if self.random.random() < 0.02:
+            self.flow = 0.0 if self.flow else round(self.random.uniform(0.5, 4.0), 2)
+        gallons = self.flow * elapsed / 60
+        self.soft_water_remaining = max(0, int(self.soft_water_remaining - gallons))
+        self.usage_today += int(gallons)
+        self.total_gallons += int(gallons)
+        self.peak_flow = max(self.peak_flow, self.flow)
+
+    def regenerate(self) -> None:
+        """Simulate a regeneration."""
+        self.regenerations_requested += 1
+        self.soft_water_remaining = self.capacity
+        self.days_until_regeneration = 7
+        self.total_regenerations += 1
+
+    def values(self, layout: PacketLayout) -> dict[str, int]:
+        """Return the raw field values of a layout."""
+        values = {
+            "_fw_major": self.firmware[0],
+            "_fw_minor": self.firmware[1],
+            "current_water_flow": self.flow,
+            "soft_water_remaining": self.soft_water_remaining,
+            "treated_water_usage_today": self.usage_today,
+            "peak_flow_today": self.peak_flow,
+            "water_hardness": self.hardness,
+            "_regen_hr": self.regeneration_time[0],
+            "_regen_min": self.regeneration_time[1],
+            "days_until_regeneration": self.days_until_regeneration,
+            "regeneration_day_override": 0,
+            "reserve_capacity": 0,
+            "resin_grains_capacity": 32,
+            "brine_soak_duration": 1,
+            "total_gallons_treated": self.total_gallons,
+            "total_gallons_treated_since_reset": self.total_gallons,
+            "total_regenerations": self.total_regenerations,
+            "total_regenerations_since_last_reset": self.total_regenerations,
+        }
+        for key, (page, setting_id) in SETTINGS.items():
+            values[key] = self.settings.get((page, setting_id), 0)
+        return {
+            name: round(values[name] * layout.scale.get(name, 1))
+            for name in layout.fields
+        }
+
+    def frame(
+        self, header: bytes, selector: bytes = b"", checksum: str = CHECKSUM_NONE
+    ) -> bytearray:
+        """Build a complete frame for a layout."""
+        layout = _LAYOUTS[(header, selector)]
+        frame = bytearray(_FRAME_LENGTHS[header])
+        frame[0:2] = header
+        frame[2 : 2 + len(selector)] = selector
+        values = self.values(layout)
+        struct.pack_into(
+            layout.fmt, frame, layout.offset, *(values[name] for name in layout.fields)
+        )
+        if (function := CHECKSUMS[checksum]) is not None:
+            frame[-1] = function(frame)
+        return frame
+
+    def handle_write(
+        self, data: bytes, checksum: str = CHECKSUM_NONE
+    ) -> list[bytearray]:
+        """Apply a command and return the frames the device answers with."""
+        if data[:2] == COMMAND_LAYOUTS["regenerate_now"].header:
+            self.regenerate()
+            return [
+                self.frame(b"uu", b"\x00", checksum),
+                self.frame(b"uu", b"\x01", checksum),
+            ]
+        if (
+            bytes(data[:2]) in _QUERY_HEADERS
+            and (bytes(data[:2]), bytes(data[2:])) in _LAYOUTS
+        ):
+            # A request for one packet family.
+            return [self.frame(bytes(data[:2]), bytes(data[2:]), checksum)]
+        if (echo := decode_setting_echo(data)) is not None:
+            page, setting_id, value = echo
+            self.settings[(page, setting_id)] = value
+            if (b"vv", bytes((page, setting_id))) in _LAYOUTS:
+                return [self.frame(b"vv", bytes((page, setting_id)), checksum)]
+        return []
+
+
+class SimulatedBleakClient:
+    """Stand-in for BleakClient talking to a SimulatedSoftener over NUS."""
+
+    def __init__(
+        self,
+        device: SimulatedSoftener,
+        profile: SimulationProfile | None = None,
+        disconnected_callback: Callable[[SimulatedBleakClient], None] | None = None,
+    ) -> None:
+        """Initialize the client."""
+        self.device = device
+        self.profile = profile or SimulationProfile()
+        self._disconnected_callback = disconnected_callback
+        self._notify: Callable[[int, bytearray], None] | None = None
+        self._task: asyncio.Task | None = None
+        self._pending = bytearray()
+        self.is_connected = False
+        self.frames_sent = 0
+        # Called with (frame, time.perf_counter()) for every frame sent.
+        self.on_frame_sent: Callable[[bytes, float], None] | None = None
+
+    async def connect(self, **kwargs) -> bool:
+        """Connect to the simulated device."""
+        self.is_connected = True
+        return True
+
+    async def disconnect(self) -> bool:
+        """Disconnect from the simulated device."""
+        self._stop()
+        return True
+
+    async def start_notify(self, char_specifier, callback, **kwargs) -> None:
+        """Start streaming frames to the callback."""
+        assert char_specifier == UART_TX_CHAR_UUID
+        self._notify = callback
+        self._send(self.device.frame(b"tt", checksum=self.profile.checksum))
+        self._task = asyncio.get_running_loop().create_task(self._stream())
+
+    async def write_gatt_char(self, char_specifier, data, response: bool = False) -> None:
+        """Apply a command to the simulated device."""
+        assert char_specifier == UART_RX_CHAR_UUID
+        if not self.is_connected:
+            raise ConnectionError("Not connected")
+        for frame in self.device.handle_write(bytes(data), self.profile.checksum):
+            self._send(frame)
+
+    def drop(self) -> None:
+        """Drop the link as if the device went out of range."""
+        self._stop()
+        if self._disconnected_callback:
+            self._disconnected_callback(self)
+
+    def _stop(self) -> None:
+        self.is_connected = False
+        self._notify = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _stream(self) -> None:
+        """Emit frames at the profile's rates."""
+        profile = self.profile
+        device = self.device
+        rng = device.random
+        slow = (
+            (b"uu", b"\x01"),
+            *((b"vv", bytes(key)) for key in SETTINGS.values()),
+            (b"ww", b""),
+        )
+        interval = 1 / profile.dashboard_rate
+        next_slow = 0.0
+        last = time.monotonic()
+        while self.is_connected:
+            await asyncio.sleep(interval if device.flow else profile.slow_interval)
+            now = time.monotonic()
+            device.tick(now - last)
+            if profile.drop_probability and rng.random() < profile.drop_probability * (
+                now - last
+            ):
+                self.drop()
+                return
+            last = now
+            self._send(device.frame(b"uu", b"\x00", profile.checksum))
+            if now >= next_slow:
+                next_slow = now + profile.slow_interval
+                for header, selector in slow:
+                    self._send(device.frame(header, selector, profile.checksum))
+
+    def _send(self, frame: bytearray) -> None:
+        """Send a frame, applying the fault injection of the profile."""
+        if self._notify is None:
+            return
+        profile = self.profile
+        rng = self.device.random
+        self.frames_sent += 1
+        if self.on_frame_sent is not None:
+            self.on_frame_sent(bytes(frame), time.perf_counter())
+        if profile.corrupt_probability and rng.random() < profile.corrupt_probability:
+            frame[rng.randrange(2, len(frame) - 1)] ^= 1 << rng.randrange(8)
+        self._pending += frame
+        if profile.merge_probability and rng.random() < profile.merge_probability:
+            return
+        data = self._pending
+        self._pending = bytearray()
+        if profile.fragment_probability and rng.random() < profile.fragment_probability:
+            split = rng.randrange(1, len(data))
+            chunks = (data[:split], data[split:])
+        else:
+            chunks = (data,)
+        for chunk in chunks:
+            for start in range(0, len(chunk), profile.mtu_payload):
+                self._notify(0, chunk[start : start + profile.mtu_payload])
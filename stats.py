@@ -0,0 +1,139 @@
+"""Hot-path counters and histograms.
+
+Everything here is allocated up front: recording an event only increments
+preallocated array slots, so instrumentation can stay enabled on the
+notification path.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Any
+
+from .parser import PACKET_FAMILIES
+
+# Upper bounds, in seconds, of the histogram buckets.
+PARSE_TIME_BOUNDS = (
+    1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 1e-2,
+)
+LATENCY_BOUNDS = (
+    1e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+CONNECT_BOUNDS = (0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
+ROUND_TRIP_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """A fixed-bucket histogram with count, sum and maximum."""
+
+    __slots__ = ("bounds", "counts", "_totals", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        """Initialize the histogram; values above the last bound overflow."""
+        self.bounds = bounds
+        self.counts = array("Q", bytes(8 * (len(bounds) + 1)))
+        # Sum and maximum.
+        self._totals = array("d", (0.0, 0.0))
+        self.count = 0
+
+    def record(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        totals = self._totals
+        totals[0] += value
+        if value > totals[1]:
+            totals[1] = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean observation."""
+        return self._totals[0] / self.count if self.count else None
+
+    @property
+    def max(self) -> float | None:
+        """Return the largest observation."""
+        return self._totals[1] if self.count else None
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return the upper bound of the bucket holding the given fraction.
+
+        Observations in the overflow bucket report the maximum instead.
+        """
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                if index == len(self.bounds):
+                    break
+                return min(self.bounds[index], self._totals[1])
+        return self._totals[1]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a summary for diagnostics."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+            "buckets": {
+                f"<={bound:g}": count
+                for bound, count in zip(self.bounds, self.counts)
+            }
+            | {"overflow": self.counts[-1]},
+        }
+
+
+# Index of each packet family in FrameStats.frames; the last slot counts
+# frames of any other type.
+FAMILY_INDEX = {
+    family.header[0]: index for index, family in enumerate(PACKET_FAMILIES)
+}
+FAMILY_NAMES = tuple(family.header.decode() for family in PACKET_FAMILIES)
+
+
+class FrameStats:
+    """Counters for the frames handled by a coordinator."""
+
+    __slots__ = (
+        "frames",
+        "parse_failures",
+        "parse_time",
+        "state_latency",
+    )
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.frames = array("Q", bytes(8 * (len(PACKET_FAMILIES) + 1)))
+        self.parse_failures = 0
+        self.parse_time = Histogram(PARSE_TIME_BOUNDS)
+        # Notification received to entity state written.
+        self.state_latency = Histogram(LATENCY_BOUNDS)
+
+    def record_frame(self, header: int) -> None:
+        """Count one frame by its first header byte."""
+        self.frames[FAMILY_INDEX.get(header, -1)] += 1
+
+    @property
+    def total_frames(self) -> int:
+        """Return the number of frames of all types."""
+        return sum(self.frames)
+
+    def frames_by_type(self) -> dict[str, int]:
+        """Return the frame counts keyed by packet family."""
+        counts = dict(zip(FAMILY_NAMES, self.frames))
+        counts["other"] = self.frames[-1]
+        return counts
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a summary for diagnostics."""
+        return {
+            "frames": self.frames_by_type(),
+            "parse_failures": self.parse_failures,
+            "parse_time": self.parse_time.as_dict(),
+            "state_latency": self.state_latency.as_dict(),
+        }
@@ -0,0 +1,28 @@
+"""Fixtures for the Bluetooth Water Softener tests.
+
+The tests run with pytest-homeassistant-custom-component. The repository
+root is the integration itself, so it is registered as the package
+`custom_components.water_softener_ble` without running its __init__. It is
+also registered under the directory's own name, which pytest imports it as,
+so the tests of the modules that do not use Home Assistant run without it.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+import types
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGE = "custom_components.water_softener_ble"
+
+if PACKAGE not in sys.modules:
+    parent = sys.modules.setdefault(
+        "custom_components", types.ModuleType("custom_components")
+    )
+    if not hasattr(parent, "__path__"):
+        parent.__path__ = []
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [str(ROOT)]
+    sys.modules[PACKAGE] = package
+    sys.modules.setdefault(ROOT.name, package)
+    parent.water_softener_ble = package
@@ -0,0 +1,139 @@
+"""Tests for the command queue."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from bleak.exc import BleakError  # noqa: E402
+
+from homeassistant.exceptions import HomeAssistantError  # noqa: E402
+
+from custom_components.water_softener_ble.commands import (  # noqa: E402
+    Command,
+    CommandQueue,
+)
+from custom_components.water_softener_ble.scheduler import (  # noqa: E402
+    PRIORITY_COMMAND,
+    PRIORITY_REFRESH,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeDevice:
+    """Records writes and echoes settings back like the softener."""
+
+    def __init__(self) -> None:
+        """Start with writes allowed and echoes enabled."""
+        self.queue: CommandQueue | None = None
+        self.writes: list[tuple[bytes, int]] = []
+        self.failures = 0
+        self.echo = True
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def write(self, payload: bytes, priority: int) -> None:
+        """Write a payload, failing the first `failures` times."""
+        await self.gate.wait()
+        self.writes.append((payload, priority))
+        if self.failures:
+            self.failures -= 1
+            raise BleakError("write failed")
+        if self.echo and payload.startswith(b"vv"):
+            echo = tuple(payload[2:5])
+            asyncio.get_running_loop().call_soon(self.queue.async_setting_echo, echo)
+
+
+def _queue(device: FakeDevice) -> CommandQueue:
+    loop = asyncio.get_running_loop()
+    hass = SimpleNamespace(
+        loop=loop,
+        async_create_background_task=lambda coro, name: loop.create_task(coro),
+    )
+    device.queue = CommandQueue(hass, device.write)
+    return device.queue
+
+
+def _setting(value: int, **kwargs) -> Command:
+    return Command(
+        name="write_setting",
+        payload=bytes((0x76, 0x76, 0x01, 0x0A, value)),
+        key=(0x01, 0x0A),
+        expect=(0x01, 0x0A, value),
+        **kwargs,
+    )
+
+
+async def test_write_confirmed_by_echo() -> None:
+    """A setting write completes once the device echoes it."""
+    device = FakeDevice()
+    queue = _queue(device)
+    await queue.async_submit(_setting(40))
+    assert device.writes == [(b"vv\x01\x0a\x28", PRIORITY_COMMAND)]
+    assert queue.last_round_trip is not None
+    await queue.async_stop()
+
+
+async def test_queued_write_is_superseded() -> None:
+    """A queued write is replaced by a newer one with the same key."""
+    device = FakeDevice()
+    queue = _queue(device)
+    device.gate.clear()
+    first = asyncio.create_task(
+        queue.async_submit(Command(name="regenerate_now", payload=b"rr\x01"))
+    )
+    await asyncio.sleep(0)
+    older = asyncio.create_task(queue.async_submit(_setting(40)))
+    newer = asyncio.create_task(queue.async_submit(_setting(50)))
+    await asyncio.sleep(0)
+    device.gate.set()
+    await asyncio.gather(first, older, newer)
+    assert [payload for payload, _ in device.writes] == [b"rr\x01", b"vv\x01\x0a\x32"]
+    await queue.async_stop()
+
+
+async def test_superseding_keeps_the_higher_priority() -> None:
+    """A refresh superseded by a command is sent at command priority."""
+    device = FakeDevice()
+    queue = _queue(device)
+    device.gate.clear()
+    blocker = asyncio.create_task(
+        queue.async_submit(Command(name="regenerate_now", payload=b"rr\x01"))
+    )
+    await asyncio.sleep(0)
+    refresh = asyncio.create_task(
+        queue.async_submit(_setting(40, priority=PRIORITY_REFRESH))
+    )
+    command = asyncio.create_task(queue.async_submit(_setting(40)))
+    await asyncio.sleep(0)
+    device.gate.set()
+    await asyncio.gather(blocker, refresh, command)
+    assert device.writes[-1] == (b"vv\x01\x0a\x28", PRIORITY_COMMAND)
+    await queue.async_stop()
+
+
+async def test_retry_after_failed_write() -> None:
+    """A failed write is retried."""
+    device = FakeDevice()
+    device.failures = 1
+    queue = _queue(device)
+    await queue.async_submit(_setting(40))
+    assert len(device.writes) == 2
+    assert queue.failures == 0
+    await queue.async_stop()
+
+
+async def test_unconfirmed_write_fails() -> None:
+    """A write that is never echoed fails after its retries."""
+    device = FakeDevice()
+    device.echo = False
+    queue = _queue(device)
+    with pytest.raises(HomeAssistantError):
+        await queue.async_submit(_setting(40, timeout=0.01, retries=1))
+    assert len(device.writes) == 2
+    assert queue.failures == 1
+    await queue.async_stop()
@@ -0,0 +1,69 @@
+"""Tests for the flow time series."""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.water_softener_ble.flow_series import RAW_CAPACITY, FlowSeries
+
+
+def approx_rows(rows: list[tuple[float, ...]]) -> list:
+    """Compare rows approximately; flows are stored as float32."""
+    return [pytest.approx(row) for row in rows]
+
+
+def test_raw_window() -> None:
+    """Raw samples are returned for the requested window only."""
+    series = FlowSeries()
+    for second in range(5):
+        series.add(float(second), second / 10)
+    assert series.window(1.0, 3.0) == approx_rows([(1.0, 0.1), (2.0, 0.2)])
+
+
+def test_raw_ring_wraps() -> None:
+    """Once full, the oldest raw samples are overwritten, in order."""
+    series = FlowSeries()
+    for second in range(RAW_CAPACITY + 10):
+        series.add(float(second), 1.0)
+    rows = series.window(0.0, float(RAW_CAPACITY + 10))
+    assert len(rows) == RAW_CAPACITY
+    assert rows[0][0] == 10.0
+    assert rows[-1][0] == RAW_CAPACITY + 9.0
+
+
+def test_buckets_are_time_weighted() -> None:
+    """Buckets hold the min/max of the flows and their time-weighted mean."""
+    series = FlowSeries()
+    series.add(0.0, 1.0)
+    series.add(0.5, 3.0)
+    series.add(1.0, 0.0)
+    series.add(2.0, 0.0)
+    assert series.window(0.0, 10.0, "1s") == approx_rows(
+        [(0.0, 1.0, 3.0, 2.0), (1.0, 0.0, 0.0, 0.0)]
+    )
+    # The open minute bucket is included.
+    assert series.window(0.0, 10.0, "1min") == approx_rows([(0.0, 0.0, 3.0, 1.0)])
+
+
+def test_gap_is_left_out() -> None:
+    """A silence is not filled, and the flow before it stays out of later buckets."""
+    series = FlowSeries()
+    series.add(0.0, 2.0)
+    series.add(0.2, 2.0)
+    series.heard(100.0)
+    series.add(100.0, 0.5)
+    series.add(100.5, 0.7)
+    series.add(101.0, 0.7)
+    assert series.window(0.0, 200.0, "1s") == approx_rows(
+        [(0.0, 2.0, 2.0, 2.0), (100.0, 0.5, 0.7, 0.6)]
+    )
+    assert series.window(0.0, 200.0, "1min") == approx_rows(
+        [(0.0, 2.0, 2.0, 2.0), (60.0, 0.5, 0.7, 0.6)]
+    )
+
+
+def test_clock_stepping_back() -> None:
+    """Samples stay ordered when the clock steps back."""
+    series = FlowSeries()
+    series.add(10.0, 1.0)
+    series.add(5.0, 2.0)
+    assert series.window(0.0, 20.0) == approx_rows([(10.0, 1.0), (10.0, 2.0)])
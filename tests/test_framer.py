@@ -0,0 +1,77 @@
+"""Tests for the frame reassembler."""
+from __future__ import annotations
+
+from custom_components.water_softener_ble.const import CHECKSUM_SUM8
+from custom_components.water_softener_ble.framer import FrameReassembler
+
+TT = bytes.fromhex("747400010004388004030036000071477800")
+WW = bytes.fromhex("77770000050291dd0190dd0119011900000043")
+VV = bytes.fromhex("7676010a3c0a0a00000000000000000000000043")
+
+
+def _framer(**kwargs) -> tuple[FrameReassembler, list[bytes]]:
+    frames: list[bytes] = []
+    return FrameReassembler(lambda frame: frames.append(bytes(frame)), **kwargs), frames
+
+
+def test_whole_frame() -> None:
+    """A notification holding one frame is passed through."""
+    framer, frames = _framer()
+    framer.feed(WW)
+    assert frames == [WW]
+    assert framer.frames == 1
+
+
+def test_split_frame() -> None:
+    """A frame split over notifications is reassembled."""
+    framer, frames = _framer()
+    framer.feed(VV[:1])
+    framer.feed(VV[1:7])
+    assert frames == []
+    framer.feed(VV[7:])
+    assert frames == [VV]
+
+
+def test_several_frames() -> None:
+    """Several frames in one notification are all emitted in order."""
+    framer, frames = _framer()
+    framer.feed(TT + WW + VV[:5])
+    framer.feed(VV[5:])
+    assert frames == [TT, WW, VV]
+
+
+def test_resync_on_garbage() -> None:
+    """Unknown bytes are skipped up to the next known header."""
+    framer, frames = _framer()
+    framer.feed(b"\x00\x01" + WW + b"\x99" + TT)
+    assert frames == [WW, TT]
+    assert framer.discarded_bytes == 3
+
+
+def test_stray_header_byte_is_dropped() -> None:
+    """Half a header is not kept in front of the next notification."""
+    framer, frames = _framer()
+    framer.feed(b"xw")
+    framer.feed(WW)
+    assert frames == [WW]
+    assert framer.discarded_bytes == 2
+
+
+def test_bad_checksum() -> None:
+    """Frames failing the checksum are counted and dropped."""
+    framer, frames = _framer(checksum=CHECKSUM_SUM8)
+    good = WW[:-1] + bytes((sum(WW[:-1]) & 0xFF,))
+    bad = good[:-1] + bytes(((good[-1] + 1) & 0xFF,))
+    framer.feed(bad + good)
+    assert frames == [good]
+    assert framer.corrupt_frames == 1
+
+
+def test_reset_drops_partial_frame() -> None:
+    """A reconnect discards the partial frame."""
+    framer, frames = _framer()
+    framer.feed(TT[:10])
+    framer.reset()
+    framer.feed(WW)
+    assert frames == [WW]
+    assert framer.discarded_bytes == 10
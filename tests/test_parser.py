@@ -0,0 +1,101 @@
+"""Tests for the packet parser and codec."""
+from __future__ import annotations
+
+import struct
+
+from custom_components.water_softener_ble.parser import (
+    PACKET_LAYOUTS,
+    PUBLISHED_KEYS,
+    UNCONFIRMED_LAYOUTS,
+    PacketCodec,
+    PacketLayout,
+    WaterSoftenerBluetoothDeviceData,
+    decode_setting_echo,
+    encode_setting,
+)
+
+TT = bytes.fromhex("747400010004388004030036000071477800")
+UU = bytes.fromhex("757500011c017c00070aed005f01d90802000039")
+VV = bytes.fromhex("7676010a3c0a0a00000000000000000000000043")
+
+
+def _ww(total: int, since_reset: int, regenerations: int, since_last: int) -> bytes:
+    return (
+        b"ww\x00\x00\x05\x02"
+        + struct.pack(">IIHH", total, since_reset, regenerations, since_last)
+        + b"\x00"
+    )
+
+
+def test_decode_families() -> None:
+    """Published fields are decoded from their frames."""
+    parser = WaterSoftenerBluetoothDeviceData()
+    assert parser.update(TT) == ["firmware_version"]
+    assert parser.update(_ww(1200, 300, 45, 2)) == [
+        "total_gallons_treated",
+        "total_gallons_treated_since_reset",
+        "total_regenerations",
+        "total_regenerations_since_last_reset",
+    ]
+    assert parser.update(VV) == ["brine_tank_level"]
+    assert parser.data == {
+        "firmware_version": "C4.56",
+        "total_gallons_treated": 1200,
+        "total_gallons_treated_since_reset": 300,
+        "total_regenerations": 45,
+        "total_regenerations_since_last_reset": 2,
+        "brine_tank_level": 60,
+    }
+
+
+def test_only_changes_are_reported() -> None:
+    """A repeated frame changes nothing but is still stamped as received."""
+    parser = WaterSoftenerBluetoothDeviceData()
+    parser.update(VV)
+    first = parser.received["brine_tank_level"]
+    assert parser.update(VV) == []
+    assert parser.received["brine_tank_level"] >= first
+
+
+def test_unconfirmed_pages_publish_nothing() -> None:
+    """The 'uu' pages are recognized, but their guessed fields are not used."""
+    parser = WaterSoftenerBluetoothDeviceData()
+    assert parser.update(UU) == []
+    assert parser.data == {}
+    assert "current_water_flow" not in PUBLISHED_KEYS
+
+    unconfirmed = WaterSoftenerBluetoothDeviceData(PACKET_LAYOUTS + UNCONFIRMED_LAYOUTS)
+    assert "current_water_flow" in unconfirmed.update(UU)
+
+
+def test_unknown_frames() -> None:
+    """Unknown headers, selectors and short frames are not recognized."""
+    parser = WaterSoftenerBluetoothDeviceData()
+    assert parser.update(b"zz" + bytes(16)) is None
+    assert parser.update(b"vv\x09\x09\x01" + bytes(15)) is None
+    assert parser.update(b"ww\x00") is None
+
+
+def test_layout_by_firmware() -> None:
+    """Layouts for newer firmware take over once the version is known."""
+    old = PacketLayout(header=b"ww", fmt=">I", fields=("total",), offset=6)
+    new = PacketLayout(
+        header=b"ww", fmt=">I", fields=("total",), offset=10, min_firmware=(4, 0)
+    )
+    codec = PacketCodec((PACKET_LAYOUTS[0], old, new))
+    frame = _ww(1, 2, 0, 0)
+    out: dict = {}
+    codec.decode(frame, out, [], {}, 0.0)
+    assert out["total"] == 1
+    codec.decode(TT, out, [], {}, 0.0)
+    codec.decode(frame, out, [], {}, 0.0)
+    assert out["total"] == 2
+
+
+def test_setting_round_trip() -> None:
+    """A setting write is decoded back from its echo."""
+    payload = encode_setting("brine_tank_level", 55)
+    assert payload == b"vv\x01\x0a\x37"
+    assert decode_setting_echo(payload) == (0x01, 0x0A, 55)
+    assert decode_setting_echo(VV) == (0x01, 0x0A, 60)
+    assert decode_setting_echo(TT) is None
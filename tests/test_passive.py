@@ -0,0 +1,170 @@
+"""Tests for the passive connection mode."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.const import CONF_ADDRESS  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.water_softener_ble import (  # noqa: E402
+    connection,
+    coordinator as coordinator_module,
+    paths,
+)
+from custom_components.water_softener_ble.const import (  # noqa: E402
+    CONF_CONNECTION_MODE,
+    CONNECTION_MODE_PASSIVE,
+)
+from custom_components.water_softener_ble.coordinator import (  # noqa: E402
+    WaterSoftenerDataUpdateCoordinator,
+)
+from custom_components.water_softener_ble.simulator import (  # noqa: E402
+    SimulatedBleakClient,
+    SimulatedSoftener,
+    SimulationProfile,
+)
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+IDLE_TIMEOUT = 0.05
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeBluetooth:
+    """Stand-in for the Bluetooth manager and bleak-retry-connector."""
+
+    def __init__(self) -> None:
+        """Create a simulated softener that sends every family at once."""
+        self.device = SimulatedSoftener(seed=1)
+        self.profile = SimulationProfile(slow_interval=0.01)
+        self.clients: list[SimulatedBleakClient] = []
+        self.callbacks = []
+
+    async def establish_connection(
+        self, client_class, device, name, disconnected_callback=None, **kwargs
+    ) -> SimulatedBleakClient:
+        """Connect a simulated client."""
+        client = SimulatedBleakClient(self.device, self.profile, disconnected_callback)
+        await client.connect()
+        self.clients.append(client)
+        return client
+
+    def register_callback(self, hass, callback, matcher, mode):
+        """Record an advertisement callback."""
+        self.callbacks.append(callback)
+        return lambda: self.callbacks.remove(callback)
+
+    def advertise(self, rssi: int = -60) -> None:
+        """Deliver an advertisement of the softener."""
+        for callback in list(self.callbacks):
+            callback(SimpleNamespace(address=ADDRESS, rssi=rssi), None)
+
+    @property
+    def connected(self) -> bool:
+        """Return True if a simulated client is connected."""
+        return any(client.is_connected for client in self.clients)
+
+
+@pytest.fixture
+def bluetooth() -> FakeBluetooth:
+    """Route connections and advertisements through a FakeBluetooth."""
+    fake = FakeBluetooth()
+    with (
+        patch.object(connection, "establish_connection", fake.establish_connection),
+        patch.object(
+            connection,
+            "async_ble_device_from_address",
+            lambda hass, address, connectable=True: SimpleNamespace(
+                address=address, name=address
+            ),
+        ),
+        patch.object(
+            paths,
+            "async_scanner_devices_by_address",
+            lambda hass, address, connectable=True: [],
+        ),
+        patch.object(paths, "async_current_allocations", lambda hass: None),
+        patch.object(
+            coordinator_module.bluetooth,
+            "async_register_callback",
+            fake.register_callback,
+        ),
+        patch.object(coordinator_module, "PASSIVE_IDLE_TIMEOUT", IDLE_TIMEOUT),
+    ):
+        yield fake
+
+
+@pytest.fixture
+async def coordinator(hass: HomeAssistant, bluetooth: FakeBluetooth):
+    """Return a passive mode coordinator, stopped after the test."""
+    entry = SimpleNamespace(
+        entry_id="passive",
+        data={CONF_ADDRESS: ADDRESS},
+        options={CONF_CONNECTION_MODE: CONNECTION_MODE_PASSIVE},
+    )
+    coordinator = WaterSoftenerDataUpdateCoordinator(hass, entry)
+    yield coordinator
+    await coordinator.async_stop()
+    await coordinator.async_shutdown()
+
+
+async def test_poll_disconnects_after_idle_timeout(
+    coordinator: WaterSoftenerDataUpdateCoordinator, bluetooth: FakeBluetooth
+) -> None:
+    """A poll connects, reads the slow families and then lets the link go."""
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert len(bluetooth.clients) == 1
+    assert bluetooth.connected
+    assert "total_gallons_treated" in coordinator.data
+
+    await asyncio.sleep(IDLE_TIMEOUT * 4)
+    assert not bluetooth.connected
+    assert not coordinator.connection.is_connected
+
+
+async def test_advertisement_triggers_refresh(
+    hass: HomeAssistant,
+    coordinator: WaterSoftenerDataUpdateCoordinator,
+    bluetooth: FakeBluetooth,
+) -> None:
+    """Seeing the softener advertise with stale data polls it."""
+    coordinator.async_start()
+    assert bluetooth.callbacks
+    assert not bluetooth.clients
+
+    bluetooth.advertise(rssi=-55)
+    await hass.async_block_till_done()
+
+    assert coordinator.rssi == -55
+    assert len(bluetooth.clients) == 1
+    assert "total_gallons_treated" in coordinator.data
+
+    # The data is fresh now, so the next advertisement does not connect.
+    bluetooth.advertise()
+    await hass.async_block_till_done()
+    assert len(bluetooth.clients) == 1
+
+
+async def test_command_reconnects(
+    coordinator: WaterSoftenerDataUpdateCoordinator, bluetooth: FakeBluetooth
+) -> None:
+    """A command after the idle disconnect connects again."""
+    await coordinator.async_refresh()
+    await asyncio.sleep(IDLE_TIMEOUT * 4)
+    assert not bluetooth.connected
+
+    await coordinator.regenerate_now()
+
+    assert len(bluetooth.clients) == 2
+    assert bluetooth.device.regenerations_requested == 1
+
+    await asyncio.sleep(IDLE_TIMEOUT * 4)
+    assert not bluetooth.connected
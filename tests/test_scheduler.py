@@ -0,0 +1,94 @@
+"""Tests for the connection slot scheduler."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.water_softener_ble.scheduler import (  # noqa: E402
+    PRIORITY_COMMAND,
+    PRIORITY_REFRESH,
+    ConnectionSlotScheduler,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def _scheduler(*addresses: str, slots: int = 1) -> tuple[ConnectionSlotScheduler, list]:
+    """Return a scheduler with devices registered and the preempted ones."""
+    scheduler = ConnectionSlotScheduler(
+        SimpleNamespace(loop=asyncio.get_running_loop(), data={})
+    )
+    preempted: list[str] = []
+    for address in addresses:
+        scheduler.async_register(
+            address, slots, lambda address=address: preempted.append(address)
+        )
+    return scheduler, preempted
+
+
+async def test_free_slot_is_granted_at_once() -> None:
+    """A free slot is granted without waiting."""
+    scheduler, _ = _scheduler("a", "b", slots=2)
+    await scheduler.async_acquire("a", PRIORITY_REFRESH, 0.0)
+    await scheduler.async_acquire("b", PRIORITY_REFRESH, 0.0)
+    assert scheduler.in_use == 2
+    assert scheduler.wait_stats["a"].count == 1
+    assert scheduler.wait_stats["a"].max == 0.0
+
+
+async def test_commands_are_served_first() -> None:
+    """Waiting commands get a released slot before refreshes."""
+    scheduler, _ = _scheduler("a", "b", "c")
+    await scheduler.async_acquire("a", PRIORITY_COMMAND, 0.0)
+    refresh = asyncio.create_task(scheduler.async_acquire("b", PRIORITY_REFRESH, 0.0))
+    await asyncio.sleep(0)
+    command = asyncio.create_task(scheduler.async_acquire("c", PRIORITY_COMMAND, 1.0))
+    await asyncio.sleep(0)
+    scheduler.async_release("a")
+    await command
+    assert not refresh.done()
+    scheduler.async_release("c")
+    await refresh
+
+
+async def test_most_overdue_refresh_first() -> None:
+    """Among refreshes, the one furthest past its deadline is served first."""
+    scheduler, _ = _scheduler("a", "b", "c")
+    await scheduler.async_acquire("a", PRIORITY_COMMAND, 0.0)
+    later = asyncio.create_task(scheduler.async_acquire("b", PRIORITY_REFRESH, 20.0))
+    earlier = asyncio.create_task(scheduler.async_acquire("c", PRIORITY_REFRESH, 10.0))
+    await asyncio.sleep(0)
+    scheduler.async_release("a")
+    await earlier
+    assert not later.done()
+    scheduler.async_release("c")
+    await later
+
+
+async def test_command_preempts_refresh() -> None:
+    """A waiting command asks a device connected for a refresh to release."""
+    scheduler, preempted = _scheduler("a", "b")
+    await scheduler.async_acquire("a", PRIORITY_REFRESH, 0.0)
+    command = asyncio.create_task(scheduler.async_acquire("b", PRIORITY_COMMAND, 0.0))
+    await asyncio.sleep(0)
+    assert preempted == ["a"]
+    scheduler.async_release("a")
+    await command
+    assert scheduler.in_use == 1
+
+
+async def test_cancelled_waiter_is_removed() -> None:
+    """A cancelled wait leaves the queue."""
+    scheduler, _ = _scheduler("a", "b")
+    await scheduler.async_acquire("a", PRIORITY_COMMAND, 0.0)
+    waiter = asyncio.create_task(scheduler.async_acquire("b", PRIORITY_REFRESH, 0.0))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    scheduler.async_release("a")
+    assert scheduler.in_use == 0